@@ -0,0 +1,75 @@
+import sys
+import time
+import random
+import argparse
+
+import vsext
+
+engines = ["groups", "bitboard", "dlx"]
+
+
+# Boards for every benchmark case: an empty grid, random sparse boards (`clues` cells of a random solution)
+# and minimal puzzles from generate_once()
+def make_boards(count, clues, seed):
+    rng = random.Random(seed)
+    solver = vsext.Solver("bitboard", seed=seed)
+    solutions = [solver.solve([vsext.encode_mask(-1)] * 81, True, 1)[0][0] for _ in range(count)]
+
+    sparse = []
+    for solution in solutions:
+        board = [vsext.encode_mask(-1)] * 81
+        for index in rng.sample(range(81), clues):
+            board[index] = solution[index]
+
+        sparse.append(board)
+
+    minimal = [solver.generate_once()[0] for _ in range(count)]
+    return {"empty": [[vsext.encode_mask(-1)] * 81], "sparse": sparse, "minimal": minimal}
+
+
+# Returns the best time per board (in microseconds) out of `repeat` runs over all boards
+def measure(engine, boards, call, repeat):
+    solver = vsext.Solver(engine)
+    best = None
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for board in boards:
+            call(solver, board)
+
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    return best / len(boards) * 1e6
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare solver engines on empty, sparse and minimal boards")
+    parser.add_argument("-n", "--count", type=int, default=50, help="number of sparse and minimal boards")
+    parser.add_argument("-c", "--clues", type=int, default=17, help="number of clues on sparse boards")
+    parser.add_argument("-l", "--limit", type=int, default=1000, help="solutions to count on empty and sparse boards")
+    parser.add_argument("-r", "--repeat", type=int, default=3, help="number of runs, the best one is reported")
+    parser.add_argument("-s", "--seed", type=int, default=1, help="seed for generating the boards")
+    args = parser.parse_args(argv)
+
+    boards = make_boards(args.count, args.clues, args.seed)
+    cases = [
+        ("empty", "solve", lambda solver, board: solver.solve(board, False, 1)),
+        ("empty", "count", lambda solver, board: solver.count_solutions(board, args.limit)),
+        ("sparse", "solve", lambda solver, board: solver.solve(board, False, 1)),
+        ("sparse", "count", lambda solver, board: solver.count_solutions(board, args.limit)),
+        ("minimal", "solve", lambda solver, board: solver.solve(board, False, 2)),
+    ]
+
+    print(f"{'us/board':<16}" + "".join(f"{engine:>12}" for engine in engines))
+    for key, name, call in cases:
+        times = [measure(engine, boards[key], call, args.repeat) for engine in engines]
+        print(f"{key + ' ' + name:<16}" + "".join(f"{value:>12.1f}" for value in times))
+        sys.stdout.flush()
+
+
+__all__ = ["engines", "make_boards", "measure"]
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+import os
+import gc
+import json
+import time
+import random
+import argparse
+import platform
+import tracemalloc
+
+import vsext
+from puzzles.difficulty import difficulties
+
+CORPUS_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus")
+CORPUS_NAMES = ["easy", "hard", "pathological"]
+
+
+# Reads one board per line from benchmarks/corpus/<name>.txt, skipping empty lines and comments (#)
+def load_corpus(name):
+    boards = []
+    with open(os.path.join(CORPUS_DIRECTORY, name + ".txt")) as file:
+        for line in file:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                boards.append(vsext.decode_state(line))
+
+    return boards
+
+
+# Every case is a list of operations (callables without arguments), each of which is timed separately
+def make_cases(solver, corpus, seed, scale):
+    rng = random.Random(seed)
+    boards = [board for name in CORPUS_NAMES for board in corpus[name]]
+    cases = {}
+
+    for name in CORPUS_NAMES:
+        cases[f"solve/{name}"] = [lambda board=board: solver.solve(board, False, 2) for board in corpus[name]]
+
+    cases["generate_once"] = [solver.generate_once] * (50 * scale)
+
+    for key, (score_min, score_max) in difficulties.items():
+        call = lambda score_min=score_min, score_max=score_max: solver.generate(score_min, score_max, 200)
+        cases[f"generate/{key}"] = [call] * (5 * scale)
+
+    cases["list_conflicts"] = [lambda board=board: vsext.list_conflicts(board) for board in boards]
+
+    cells = [(rng.choice(boards), rng.randrange(81)) for _ in range(500 * scale)]
+    cases["list_candidates"] = [lambda board=board, index=index: vsext.list_candidates(board, index) for board, index in cells]
+    cases["list_all_candidates"] = [lambda board=board: vsext.list_all_candidates(board) for board in boards]
+
+    # The same operations on vsext.Board, which keeps conflicts and candidates up to date instead of computing them
+    native = {id(board): vsext.Board(board) for board in boards}
+    cases["board/conflicts"] = [native[id(board)].conflicts for board in boards]
+    cases["board/candidates"] = [
+        lambda board=native[id(board)], index=index: board.candidates(index) for board, index in cells
+    ]
+    cases["board/all_candidates"] = [native[id(board)].all_candidates for board in boards]
+    # Every cell is emptied and then restored, so the board is the same after every run
+    cases["board/set"] = [
+        lambda board=native[id(board)], index=index, mask=mask: board.set(index, mask)
+        for board, index in cells for mask in (vsext.encode_mask(-1), board[index])
+    ]
+
+    return cases
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+# Returns the number of Python memory blocks and bytes allocated per operation and still held afterwards
+# (i.e. mostly the results). Memory allocated and freed during an operation is not counted
+def measure_retained(operations):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    results = [operation() for operation in operations]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    ignored = [tracemalloc.Filter(False, tracemalloc.__file__)]
+    stats = after.filter_traces(ignored).compare_to(before.filter_traces(ignored), "lineno")
+    del results
+
+    blocks = sum(max(stat.count_diff, 0) for stat in stats)
+    size = sum(max(stat.size_diff, 0) for stat in stats)
+    return blocks / len(operations), size / len(operations)
+
+
+# Returns the number of native allocations made by vsext per operation, whether freed or not,
+# or None unless vsext was built to count them (see vsext.native_allocations())
+def measure_native(operations):
+    before = vsext.native_allocations()
+    if before is None:
+        return None
+
+    for operation in operations:
+        operation()
+
+    return (vsext.native_allocations() - before) / len(operations)
+
+
+# `reset` (if given) is called before every run over the operations, so that each run repeats the same work
+def run_case(operations, repeat, reset=None):
+    reset = reset or (lambda: None)
+    reset()
+    for operation in operations[:min(len(operations), 3)]:
+        operation()
+
+    latencies = []
+    for _ in range(repeat):
+        reset()
+        for operation in operations:
+            start = time.perf_counter_ns()
+            operation()
+            latencies.append(time.perf_counter_ns() - start)
+
+    reset()
+    blocks, size = measure_retained(operations)
+    reset()
+    native = measure_native(operations)
+    return {
+        "ops": len(latencies),
+        "ops_per_s": len(latencies) / (sum(latencies) / 1e9),
+        "p50_us": percentile(latencies, 0.50) / 1e3,
+        "p99_us": percentile(latencies, 0.99) / 1e3,
+        "retained_blocks_per_op": blocks,
+        "retained_bytes_per_op": size,
+        "native_allocs_per_op": native,
+    }
+
+
+def run(engine="groups", seed=1, repeat=3, scale=1, pattern="", report=None):
+    solver = vsext.Solver(engine, seed=seed)
+    corpus = {name: load_corpus(name) for name in CORPUS_NAMES}
+    cases = make_cases(solver, corpus, seed, scale)
+
+    results = {}
+    for name, operations in cases.items():
+        if pattern not in name:
+            continue
+
+        results[name] = run_case(operations, repeat, lambda: solver.reseed(seed))
+        if report is not None:
+            report(format_row(name, results[name]))
+
+    return {
+        "meta": {
+            "engine": engine,
+            "seed": seed,
+            "repeat": repeat,
+            "scale": scale,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "cases": results,
+    }
+
+
+def format_header():
+    return (
+        f"{'case':<24}{'ops/s':>12}{'p50 us':>12}{'p99 us':>12}"
+        f"{'kept blk/op':>12}{'kept B/op':>12}{'native/op':>12}"
+    )
+
+
+def format_row(name, result):
+    native = result["native_allocs_per_op"]
+    return (
+        f"{name:<24}{result['ops_per_s']:>12.1f}{result['p50_us']:>12.1f}{result['p99_us']:>12.1f}"
+        f"{result['retained_blocks_per_op']:>12.1f}{result['retained_bytes_per_op']:>12.0f}"
+        f"{'-' if native is None else f'{native:.1f}':>12}"
+    )
+
+
+# Prints the change of every metric of the cases present in both results (ratios above 1 are improvements)
+def compare(base, current, report):
+    report(f"{'case':<24}{'ops/s':>12}{'p50':>12}{'p99':>12}")
+    for name, result in current["cases"].items():
+        if name not in base["cases"]:
+            continue
+
+        old = base["cases"][name]
+        report(
+            f"{name:<24}{result['ops_per_s'] / old['ops_per_s']:>11.2f}x"
+            f"{old['p50_us'] / result['p50_us']:>11.2f}x{old['p99_us'] / result['p99_us']:>11.2f}x"
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the vsext solver and generator on a fixed corpus")
+    parser.add_argument("-e", "--engine", default="groups", help="solver engine (default: groups)")
+    parser.add_argument("-s", "--seed", type=int, default=1, help="seed for picking cells and generating puzzles")
+    parser.add_argument("-r", "--repeat", type=int, default=3, help="number of runs over every case")
+    parser.add_argument("-x", "--scale", type=int, default=1, help="multiplier for the number of operations")
+    parser.add_argument("-k", "--filter", default="", help="only run cases whose name contains this string")
+    parser.add_argument("-o", "--output", help="save the results as JSON to this file")
+    parser.add_argument("-c", "--compare", help="compare the results with those saved in this file")
+    args = parser.parse_args(argv)
+
+    report = lambda text: print(text, flush=True)
+    report(format_header())
+    results = run(args.engine, args.seed, args.repeat, args.scale, args.filter, report)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+    if args.compare:
+        with open(args.compare) as file:
+            base = json.load(file)
+
+        report("")
+        compare(base, results, report)
+
+
+__all__ = ["load_corpus", "make_cases", "run_case", "run", "compare"]
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
 from .utils import *
 from .buttons import *
 
+from .profiling import *
@@ -0,0 +1,85 @@
+import os
+import time
+import functools
+
+ENVIRONMENT_VARIABLE = "VALIDSUDOKU_PROFILE"
+
+
+class ProfileRecord:
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+
+    def add(self, elapsed):
+        self.count += 1
+        self.total += elapsed
+        self.maximum = max(self.maximum, elapsed)
+
+
+# Counts calls and measures the time spent in methods wrapped by install(). Methods are wrapped on their class,
+# so nothing is measured (and nothing costs any time) unless they were installed. Times of nested calls are included
+class Profiler:
+    def __init__(self):
+        self.records = {}  # {"Class.method": ProfileRecord}
+        self.installed = []  # [(owner, attribute, original)]
+
+    def install(self, owner, attribute):
+        name = f"{owner.__name__}.{attribute}"
+        original = owner.__dict__[attribute]
+        record = self.records.setdefault(name, ProfileRecord())
+
+        @functools.wraps(original)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                record.add(time.perf_counter() - start)
+
+        setattr(owner, attribute, wrapper)
+        self.installed.append((owner, attribute, original))
+
+    def uninstall(self):
+        for owner, attribute, original in reversed(self.installed):
+            setattr(owner, attribute, original)
+
+        self.installed.clear()
+
+    # Records are cleared in place, since installed wrappers keep adding to them
+    def reset(self):
+        for record in self.records.values():
+            record.reset()
+
+    def report(self):
+        lines = [f"{'method':<32}{'calls':>10}{'total ms':>12}{'mean ms':>12}{'max ms':>12}"]
+        for name, record in sorted(self.records.items(), key=lambda item: -item[1].total):
+            mean = record.total / record.count if record.count > 0 else 0.0
+            lines.append(
+                f"{name:<32}{record.count:>10}{record.total * 1e3:>12.2f}{mean * 1e3:>12.3f}{record.maximum * 1e3:>12.3f}"
+            )
+
+        return "\n".join(lines)
+
+    def dump(self, path):
+        with open(path, "w") as file:
+            file.write(self.report() + "\n")
+
+
+# The environment variable (any value other than "" or "0") takes precedence over the "profile" option
+# in the "debug" section of the config
+def profiling_enabled(config=None):
+    value = os.environ.get(ENVIRONMENT_VARIABLE)
+    if value is not None:
+        return value not in ("", "0")
+
+    return (config is not None) and config.getboolean("debug", "profile", fallback=False)
+
+
+profiler = Profiler()
+
+
+__all__ = ["ProfileRecord", "Profiler", "profiling_enabled", "profiler"]
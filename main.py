@@ -1,43 +1,91 @@
+import os
+
 from kivy import app, properties
 from kivy.clock import Clock
+from kivy.logger import Logger
 from kivy.lang.builder import Builder
 from kivy.core.window import Window
 from kivy.core.clipboard import Clipboard
 from kivy.event import EventDispatcher
 
-from common import AnimatedColorProperty, AnimatedBoundedNumericProperty
+from common import AnimatedProperty, AnimatedColorProperty, AnimatedBoundedNumericProperty, ProxyLayout, FboLayout
+from common import profiler, profiling_enabled
+from screens.game import GameScreen
 from message import Message
 from colorscheme import Colorscheme, colorschemes
+from puzzles import difficulties, targeted, TARGETED_LIMIT, PuzzleBank, PuzzleProducer
+from puzzles import GameSnapshot, SnapshotWriter, read_snapshot, MoveJournal
 import vsext
 
 
 class AppState(EventDispatcher):
     colorscheme = properties.StringProperty("black")
     difficulty = properties.StringProperty("")
-    solution = properties.ListProperty(None, allownone=True)
-    board = properties.ListProperty(None, allownone=True)
+    solution = properties.ObjectProperty(None, allownone=True)  # vsext.Board
+    board = properties.ObjectProperty(None, allownone=True)  # vsext.Board
     timer = properties.NumericProperty(0.0)
     mistakes = properties.NumericProperty(0)
     assist = properties.BooleanProperty(False)
+    sequence = 0  # Of the last snapshot taken
 
-    def load_config(self, config):
+    # The game itself is saved as a snapshot (see puzzles/save.py). It is only kept in the config until a snapshot
+    # of it has been written (i.e. after an upgrade, or while writing fails), and is only loaded if its sequence
+    # number is greater than `after`. Returns whether a game was loaded from the config
+    def load_config(self, config, after=-1):
         self.colorscheme = config.get("state", "colorscheme")
+        self.assist = config.getboolean("state", "assist")
+        sequence = config.getint("state", "sequence")
+        if sequence <= after:
+            return False
+
+        solution = vsext.decode_state(config.get("state", "solution"))
+        board = vsext.decode_state(config.get("state", "board"))
+        if (solution is None) or (board is None):
+            return False
+
         self.difficulty = config.get("state", "difficulty")
-        self.solution = vsext.decode_state(config.get("state", "solution"))
-        self.board = vsext.decode_state(config.get("state", "board"))
+        self.solution = vsext.Board(solution)
+        self.board = vsext.Board(board)
         self.timer = config.getint("state", "timer")
         self.mistakes = config.getint("state", "mistakes")
-        self.assist = config.getboolean("state", "assist")
+        self.sequence = sequence
+        return True
 
-    def dump_config(self, config):
-        config.set("state", "colorscheme", self.colorscheme)
-        config.set("state", "difficulty", self.difficulty)
-        config.set("state", "solution", "" if self.solution is None else vsext.encode_state(self.solution))
-        config.set("state", "board", "" if self.board is None else vsext.encode_state(self.board))
-        config.set("state", "timer", int(self.timer))
-        config.set("state", "mistakes", self.mistakes)
-        config.set("state", "assist", self.assist)
-        config.write()
+    # The file is only written when a value has changed, which is rarely the case unless snapshots are not saved
+    def dump_config(self, config, saved):
+        values = {"colorscheme": self.colorscheme, "assist": self.assist}
+        if saved or (self.board is None) or (self.solution is None):
+            values.update({"difficulty": "", "solution": "", "board": "", "timer": 0, "mistakes": 0, "sequence": 0})
+        else:
+            values.update({
+                "difficulty": self.difficulty,
+                "solution": vsext.encode_state(self.solution),
+                "board": vsext.encode_state(self.board),
+                "timer": int(self.timer),
+                "mistakes": self.mistakes,
+                "sequence": self.sequence
+            })
+
+        changed = False
+        for key, value in values.items():
+            if config.get("state", key) != str(value):
+                config.set("state", key, value)
+                changed = True
+
+        if changed:
+            config.write()
+
+    def load_snapshot(self, snapshot):
+        self.difficulty = snapshot.difficulty
+        self.solution = None if snapshot.solution is None else vsext.Board(snapshot.solution)
+        self.board = None if snapshot.board is None else vsext.Board(snapshot.board)
+        self.timer = snapshot.timer
+        self.mistakes = snapshot.mistakes
+        self.sequence = snapshot.sequence
+
+    def dump_snapshot(self):
+        self.sequence += 1
+        return GameSnapshot(self.difficulty, self.board, self.solution, self.timer, self.mistakes, self.sequence)
 
 
 class App(app.App):
@@ -55,13 +103,11 @@ class App(app.App):
             self.state.timer += dt
 
         self.solver = vsext.Solver()
-        self.difficulties = {
-            "easy": (0, vsext.score_step * 2),
-            "normal": (vsext.score_step * 2, vsext.score_step * 5),
-            "hard": (vsext.score_step * 5, -1)
-        }
-        self.pregenerated = {key: None for key in self.difficulties.keys()}
-        self.pregenerator = Clock.schedule_interval(self.pregenerate, 0.05)
+        self.difficulties = dict(difficulties)
+        self.bank = None
+        self.writer = None
+        self.journal = None
+        self.producer = PuzzleProducer(self.difficulties, notify=Clock.create_trigger(self.collect_pregenerated))
         self.timer = Clock.create_trigger(timer_callback, 0.1, True)
 
     @property
@@ -106,19 +152,14 @@ class App(app.App):
         view = Message(text=text)
         view.open()
 
-    def pregenerate(self, *args):
-        if None not in self.pregenerated.values():
-            self.pregenerator.cancel()
+    def collect_pregenerated(self, *args):
+        if self.bank is None:
             return
 
-        board, score = self.solver.generate_once()
-        for key, (score_min, score_max) in self.difficulties.items():
-            if self.pregenerated[key] is not None:
-                continue
+        for key, board, score in self.producer.collect():
+            self.bank.push(key, board, score)
 
-            if (score_min <= score) and ((score <= score_max) or (score_max < 0)):
-                self.pregenerated[key] = board
-                break
+        self.producer.set_demand({key: self.bank.free(key) for key in self.difficulties.keys()})
 
     def start_game(self, board):
         solutions = self.solver.solve(board, False, 2)
@@ -129,10 +170,12 @@ class App(app.App):
             self.send_message("Game state has multiple solutions")
             return
 
-        self.state.solution = solutions[0][0]
-        self.state.board = board
+        self.state.solution = vsext.Board(solutions[0][0])
+        self.state.board = vsext.Board(board)
         self.state.timer = 0
         self.state.mistakes = 0
+        self.journal.reset(self.state.board)
+        self.autosave()
         self.screen_manager.get_screen("game").select(None)
         self.switch_screen("game")
 
@@ -141,27 +184,39 @@ class App(app.App):
         if key not in self.difficulties:
             return
 
-        if self.pregenerated[key] is None:
+        # Puzzles are generated on the UI thread only when the bank has run out, so the search is bounded the same way
+        # as the producer's; the closest puzzle found is played if none of them is in range
+        banked = self.bank.pop(key)
+        if banked is None:
             score_min, score_max = self.difficulties[key]
-            board = self.solver.generate(score_min, score_max, 200)[0]
+            if key in targeted:
+                board = self.solver.generate_targeted(score_min, score_max, TARGETED_LIMIT)[0]
+            else:
+                board = self.solver.generate(score_min, score_max, 200)[0]
         else:
-            board = self.pregenerated[key]
-            self.pregenerated[key] = None
+            board = banked[0]
 
-        self.pregenerator()
+        self.collect_pregenerated()
         self.state.difficulty = difficulty
         self.start_game(board)
 
     def start_imported_game(self):
         text = Clipboard.paste()
         board = vsext.decode_state(text.strip())
-        if board is None:
+
+        # Other sizes decode as boards of other orders, which the game does not support
+        if (board is None) or (len(board) != self.solver.order ** 4):
             self.send_message("No valid game state in clipboard")
             return
 
         self.state.difficulty = ""
         self.start_game(board)
 
+    # Schedules the game to be saved on the writer's thread; called after every change of the game
+    def autosave(self):
+        if self.writer is not None:
+            self.writer.save(self.state.dump_snapshot().pack())
+
     def export_board(self):
         if self.state.board is None:
             return
@@ -179,18 +234,75 @@ class App(app.App):
             return True
 
     def on_start(self):
-        self.state.load_config(self.config)
+        capacity = {key: self.config.getint("pregenerate", key) for key in self.difficulties.keys()}
+        self.bank = PuzzleBank(os.path.join(self.user_data_dir, "bank"), self.difficulties.keys(), capacity)
+        self.producer.start()
+        self.collect_pregenerated()
+
+        path = os.path.join(self.user_data_dir, "game.sav")
+        snapshot = read_snapshot(path)
+        if snapshot is not None:
+            self.state.load_snapshot(snapshot)
+
+        # A game left in the config is cleared by the first config write after a successful snapshot write,
+        # but the app may be killed before that: the config only holds the latest game if it was written with
+        # the sequence number of a snapshot that never made it to the disk
+        saved = not self.state.load_config(self.config, after=-1 if snapshot is None else snapshot.sequence)
+
+        # The journal is written on every move, so it can be ahead of the snapshot. If it belongs to the same game,
+        # the board is taken from it, otherwise it starts over from the saved board
+        self.journal = MoveJournal(os.path.join(self.user_data_dir, "game.journal"))
+        if self.state.board is not None:
+            try:
+                if self.journal.find(self.state.board) is None:
+                    self.journal.reset(self.state.board)
+                else:
+                    self.state.board = self.journal.board()
+            except (ValueError, IndexError) as error:
+                Logger.warning(f"Game: discarding the damaged move journal: {error}")
+                self.journal.reset(self.state.board)
+
+        def error_callback(error):
+            Logger.error(f"Game: failed to save the game to {path}: {error}")
+
+        self.writer = SnapshotWriter(path, saved=saved, on_error=error_callback)
+        self.writer.start()
+        if not saved:
+            self.autosave()
+
         self.set_colorscheme(self.state.colorscheme, animate=False)
         self.alpha = 1.0
 
         Window.bind(on_keyboard=self.on_keyboard)
 
     def on_pause(self):
-        self.state.dump_config(self.config)
+        self.producer.stop()
+        self.autosave()
+        self.writer.flush()
+        self.state.dump_config(self.config, self.writer.saved)
+        self.bank.flush()
         return True
 
+    def on_resume(self):
+        self.producer.start()
+        self.collect_pregenerated()
+
     def on_stop(self):
-        self.state.dump_config(self.config)
+        self.producer.stop()
+        self.collect_pregenerated()
+        self.autosave()
+        self.writer.stop()
+        self.journal.close()
+        self.journal = None
+        self.state.dump_config(self.config, self.writer.saved)
+        self.writer = None
+        self.bank.close()
+        self.bank = None
+
+        if len(profiler.installed) > 0:
+            path = os.path.join(self.user_data_dir, "profile.txt")
+            profiler.dump(path)
+            Logger.info(f"Profiling: call statistics saved to {path}\n{profiler.report()}")
 
     def build_config(self, config):
         config.setdefaults("state", {
@@ -200,10 +312,26 @@ class App(app.App):
             "board": "",
             "timer": 0,
             "mistakes": 0,
+            "sequence": 0,
             "assist": False
         })
+        config.setdefaults("pregenerate", {
+            "easy": 32,
+            "normal": 32,
+            "hard": 32
+        })
+        config.setdefaults("debug", {
+            "profile": False
+        })
 
     def build(self):
+        # UI hot paths are only wrapped with profiling hooks when asked to (see common/profiling.py)
+        if profiling_enabled(self.config):
+            profiler.install(GameScreen, "refresh")
+            profiler.install(ProxyLayout, "do_layout")
+            profiler.install(AnimatedProperty, "__set__")
+            profiler.install(FboLayout, "update_fbo")
+
         self.title = "Valid Sudoku"
         self.use_kivy_settings = False
         self.screen_manager = Builder.load_file("main.kv")
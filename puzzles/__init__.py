@@ -0,0 +1,6 @@
+from .difficulty import *
+from .bank import *
+from .producer import *
+from .board import *
+from .save import *
+from .journal import *
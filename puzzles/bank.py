@@ -0,0 +1,123 @@
+import os
+import mmap
+import struct
+
+import vsext
+
+
+# Cell values are packed two per byte (0 for unfilled cells, value + 1 otherwise), followed by the score
+RECORD = struct.Struct("<41sH")
+HEADER = struct.Struct("<4sHHI")  # magic, version, record size, record count
+MAGIC = b"VSPB"
+VERSION = 1
+
+
+def pack_state(state):
+    values = [vsext.decode_mask(mask) + 1 for mask in state]
+    if len(values) % 2 != 0:
+        values.append(0)
+
+    return bytes((values[i] << 4) | values[i + 1] for i in range(0, len(values), 2))
+
+
+def unpack_state(data):
+    values = []
+    for byte in data:
+        values.append(byte >> 4)
+        values.append(byte & 0x0F)
+
+    return [vsext.encode_mask(value - 1) for value in values[:81]]
+
+
+# Fixed-capacity stack of puzzles stored in a memory-mapped file
+class BankFile:
+    def __init__(self, path, capacity):
+        self.path = path
+        self.capacity = capacity
+
+        size = HEADER.size + RECORD.size * capacity
+        count = 0
+
+        mode = "r+b" if os.path.exists(path) else "w+b"
+        self.file = open(path, mode)
+
+        header = self.file.read(HEADER.size)
+        if len(header) == HEADER.size:
+            magic, version, record_size, count = HEADER.unpack(header)
+            if (magic != MAGIC) or (version != VERSION) or (record_size != RECORD.size):
+                count = 0
+
+        self.file.truncate(size)
+        self.map = mmap.mmap(self.file.fileno(), size)
+        self.count = min(count, capacity)
+        self.write_header()
+
+    def write_header(self):
+        HEADER.pack_into(self.map, 0, MAGIC, VERSION, RECORD.size, self.count)
+
+    def push(self, state, score):
+        if self.count >= self.capacity:
+            return False
+
+        # The record is written before the header, so that an interrupted push never exposes garbage
+        RECORD.pack_into(self.map, HEADER.size + RECORD.size * self.count, pack_state(state), score)
+        self.count += 1
+        self.write_header()
+        return True
+
+    def pop(self):
+        if self.count <= 0:
+            return None
+
+        self.count -= 1
+        data, score = RECORD.unpack_from(self.map, HEADER.size + RECORD.size * self.count)
+        self.write_header()
+        return unpack_state(data), score
+
+    def flush(self):
+        self.map.flush()
+
+    def close(self):
+        self.map.flush()
+        self.map.close()
+        self.file.close()
+
+
+# Persistent collection of pregenerated puzzles with one file per difficulty level.
+# Capacity is either shared by all levels or given as a {key: capacity} dict
+class PuzzleBank:
+    def __init__(self, directory, keys, capacity=32):
+        os.makedirs(directory, exist_ok=True)
+
+        if not isinstance(capacity, dict):
+            capacity = {key: capacity for key in keys}
+
+        self.directory = directory
+        self.files = {key: BankFile(os.path.join(directory, f"{key}.bank"), capacity[key]) for key in keys}
+
+    def count(self, key):
+        return self.files[key].count
+
+    def free(self, key):
+        file = self.files[key]
+        return file.capacity - file.count
+
+    def is_full(self, key):
+        return self.free(key) <= 0
+
+    def push(self, key, state, score):
+        return self.files[key].push(state, score)
+
+    def pop(self, key):
+        return self.files[key].pop()
+
+    def flush(self):
+        for file in self.files.values():
+            file.flush()
+
+    def close(self):
+        for file in self.files.values():
+            file.close()
+
+
+__all__ = ["pack_state", "unpack_state", "BankFile", "PuzzleBank"]
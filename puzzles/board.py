@@ -0,0 +1,88 @@
+import vsext
+
+
+# Indexes of the cells sharing a row, column or box with each cell of a 9x9 board
+PEERS = tuple(
+    tuple(
+        other for other in range(81) if (other != index) and (
+            (other // 9 == index // 9) or (other % 9 == index % 9)
+            or ((other // 27 == index // 27) and (other % 9 // 3 == index % 9 // 3))
+        )
+    )
+    for index in range(81)
+)
+
+
+# Game board with the state of every cell as shown by the game screen. Conflicts and candidates are maintained
+# by vsext.Board, so set() returns the changed cell and only the peers whose conflict or blocked state changed,
+# and reading the candidates of any cell costs no search
+class BoardModel:
+    def __init__(self, board, solution):
+        self.board = board if isinstance(board, vsext.Board) else vsext.Board(board)
+        self.solution = list(solution)
+        self.correct = sum(mask == mask_ref for mask, mask_ref in zip(self.board, self.solution))
+        self.blocked = self.find_blocked()
+
+    @staticmethod
+    def value_of(mask):
+        value = vsext.decode_mask(mask)
+        return value if value < 9 else -1
+
+    @property
+    def finished(self):
+        return self.correct == len(self.solution)
+
+    def text(self, index):
+        value = self.value_of(self.board[index])
+        return str(value + 1) if value >= 0 else ""
+
+    def is_warning(self, index):
+        return (self.value_of(self.board[index]) >= 0) and (self.board[index] != self.solution[index])
+
+    def is_error(self, index):
+        return self.board.is_conflict(index)
+
+    def candidates(self, index):
+        return self.board.candidates(index)
+
+    # Unfilled cells which none of the values fit (highlighted in assist mode)
+    def is_blocked(self, index):
+        return index in self.blocked
+
+    def find_blocked(self):
+        return set(
+            index for index, mask in enumerate(self.board.all_candidates())
+            if (mask == 0) and (self.value_of(self.board[index]) < 0)
+        )
+
+    # Only a change of value changes candidates, and only those of the cell and its peers. Returns the cells
+    # whose blocked state changed
+    def update_blocked(self, cells):
+        changed = []
+        for index in cells:
+            blocked = (self.value_of(self.board[index]) < 0) and (self.board.candidates(index) == 0)
+            if blocked == (index in self.blocked):
+                continue
+
+            if blocked:
+                self.blocked.add(index)
+            else:
+                self.blocked.remove(index)
+
+            changed.append(index)
+
+        return changed
+
+    # Returns the indexes of the cells whose text, warning, error or blocked state may have changed
+    def set(self, index, mask):
+        self.correct += (mask == self.solution[index]) - (self.board[index] == self.solution[index])
+        value_changed = self.value_of(mask) != self.value_of(self.board[index])
+        changed = set(self.board.set(index, mask))
+
+        if value_changed:
+            changed.update(self.update_blocked((index,) + PEERS[index]))
+
+        return [index] + [other for other in changed if other != index]
+
+
+__all__ = ["BoardModel"]
@@ -0,0 +1,29 @@
+import vsext
+
+
+# Score ranges (min, max) of every difficulty level; negative max means no upper bound
+difficulties = {
+    "easy": (0, vsext.score_step * 2),
+    "normal": (vsext.score_step * 2, vsext.score_step * 5),
+    "hard": (vsext.score_step * 5, -1)
+}
+
+# Difficulty levels for which Solver.generate_targeted() finds puzzles faster than generating them until one is
+# in range (Solver.generate()); for the other levels most fresh puzzles are in range already
+targeted = {"hard"}
+
+
+def in_range(score, score_range):
+    score_min, score_max = score_range
+    return (score_min <= score) and ((score <= score_max) or (score_max < 0))
+
+
+def classify(score, ranges=difficulties):
+    for key, score_range in ranges.items():
+        if in_range(score, score_range):
+            return key
+
+    return None
+
+
+__all__ = ["difficulties", "targeted", "in_range", "classify"]
@@ -0,0 +1,138 @@
+import os
+import sys
+import time
+import queue
+import signal
+import argparse
+import multiprocessing
+
+import vsext
+from .difficulty import difficulties, classify
+
+
+def generate_forever(output, stop, seed, stream):
+    # Interrupts are handled by the parent process, which shuts the workers down
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    solver = vsext.Solver(seed=seed, stream=stream)
+
+    while not stop.is_set():
+        board, score = solver.generate_once()
+        output.put((vsext.encode_state(board), score))
+
+
+class FarmStats:
+    def __init__(self, keys):
+        self.start_time = time.monotonic()
+        self.counts = {key: 0 for key in keys}
+        self.total = 0
+
+    def add(self, key):
+        self.counts[key] += 1
+        self.total += 1
+
+    def report(self):
+        elapsed = max(time.monotonic() - self.start_time, 1e-9)
+        parts = [f"{self.total} puzzles in {elapsed:.1f}s ({self.total / elapsed:.1f}/s)"]
+
+        for key, count in self.counts.items():
+            share = count / self.total if self.total > 0 else 0.0
+            parts.append(f"{key}: {count} ({count / elapsed:.2f}/s, {share:.1%})")
+
+        return ", ".join(parts)
+
+
+# Generates puzzles in a pool of worker processes and appends them to one file per difficulty level.
+# Worker i generates the stream i of the seed, so the puzzles of every worker can be reproduced with the same seed
+class Farm:
+    def __init__(self, directory, workers=0, ranges=difficulties, seed=None):
+        self.directory = directory
+        self.workers = workers if workers > 0 else os.cpu_count() or 1
+        self.ranges = ranges
+        self.seed = seed if seed is not None else int.from_bytes(os.urandom(8), "little")
+        self.stats = FarmStats(ranges.keys())
+
+    def run(self, count=0, duration=0.0, interval=10.0, report=print):
+        os.makedirs(self.directory, exist_ok=True)
+
+        # Files are line-buffered, so that every puzzle is written out as soon as it is received
+        files = {key: open(os.path.join(self.directory, f"{key}.txt"), "a", buffering=1) for key in self.ranges}
+
+        output = multiprocessing.Queue(maxsize=self.workers * 64)
+        stop = multiprocessing.Event()
+        processes = [
+            multiprocessing.Process(target=generate_forever, args=(output, stop, self.seed, stream), daemon=True)
+            for stream in range(self.workers)
+        ]
+
+        for process in processes:
+            process.start()
+
+        report(f"seed {self.seed}, {self.workers} workers")
+        self.stats = FarmStats(self.ranges.keys())
+        deadline = self.stats.start_time + duration if duration > 0.0 else None
+        next_report = self.stats.start_time + interval
+
+        try:
+            while (count <= 0) or (self.stats.total < count):
+                now = time.monotonic()
+                if (deadline is not None) and (now >= deadline):
+                    break
+
+                if now >= next_report:
+                    report(self.stats.report())
+                    next_report = now + interval
+
+                try:
+                    board, score = output.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+
+                key = classify(score, self.ranges)
+                if key is None:
+                    continue
+
+                files[key].write(f"{board} {score}\n")
+                self.stats.add(key)
+        finally:
+            stop.set()
+
+            # Drain the queue so that no worker stays blocked on a full one
+            while any(process.is_alive() for process in processes):
+                try:
+                    output.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+
+            for process in processes:
+                process.join()
+
+            for file in files.values():
+                file.close()
+
+        report(self.stats.report())
+        return self.stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate sudoku puzzles sorted by difficulty")
+    parser.add_argument("directory", help="output directory, receives one <difficulty>.txt file per level")
+    parser.add_argument("-w", "--workers", type=int, default=0, help="number of worker processes (default: CPU count)")
+    parser.add_argument("-n", "--count", type=int, default=0, help="stop after this many puzzles")
+    parser.add_argument("-t", "--duration", type=float, default=0.0, help="stop after this many seconds")
+    parser.add_argument("-i", "--interval", type=float, default=10.0, help="seconds between progress reports")
+    parser.add_argument("-s", "--seed", type=int, default=None, help="seed for the workers (default: random)")
+    args = parser.parse_args(argv)
+
+    farm = Farm(args.directory, workers=args.workers, seed=args.seed)
+
+    try:
+        farm.run(args.count, args.duration, args.interval, report=lambda text: print(text, file=sys.stderr))
+    except KeyboardInterrupt:
+        pass
+
+
+__all__ = ["FarmStats", "Farm"]
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+import os
+import mmap
+import struct
+
+import vsext
+from .save import BOARD_SIZE, pack_masks, unpack_masks
+
+# A move is the index of a cell, its mask before and after the move, and the game time of the move in seconds
+MOVE = struct.Struct("<BHHf")
+# The header is followed by the move count and position, which are the only fields moves change, and the base board
+HEADER = struct.Struct("<4sHH")  # magic, version, move size
+POSITION = struct.Struct("<II")  # move count, position
+BASE = struct.Struct(f"<{BOARD_SIZE}s")
+POSITION_OFFSET = HEADER.size
+BASE_OFFSET = POSITION_OFFSET + POSITION.size
+MOVES_OFFSET = BASE_OFFSET + BASE.size
+MAGIC = b"VSMJ"
+VERSION = 1
+INITIAL_CAPACITY = 256
+
+
+# Applies moves (index, old mask, new mask, time) to a copy of `base`, checking that every move starts from the mask
+# it recorded. Returns the resulting vsext.Board, raises ValueError on the first move which does not fit the board
+def replay(base, moves):
+    board = vsext.Board(base)
+    for number, (index, mask_old, mask_new, _) in enumerate(moves):
+        if (index >= len(board)) or (board[index] != mask_old):
+            raise ValueError(f"Move {number} does not match the board")
+
+        board.set(index, mask_new)
+
+    return board
+
+
+# Moves of a game in a memory-mapped file, following the board they start from (the base). Moves before `position`
+# are applied, the ones after it were undone and can be redone until a new move replaces them. Undo and redo only
+# move the position, and every change is written straight into the mapping, so it outlives the process
+class MoveJournal:
+    def __init__(self, path):
+        self.path = path
+        self.base = [0] * 81
+        self.count = 0
+        self.position = 0
+
+        mode = "r+b" if os.path.exists(path) else "w+b"
+        self.file = open(path, mode)
+
+        header = self.file.read(MOVES_OFFSET)
+        if len(header) == MOVES_OFFSET:
+            magic, version, move_size = HEADER.unpack_from(header)
+            count, position = POSITION.unpack_from(header, POSITION_OFFSET)
+            size = os.fstat(self.file.fileno()).st_size
+            if (
+                (magic == MAGIC) and (version == VERSION) and (move_size == MOVE.size) and (position <= count)
+                and (MOVES_OFFSET + MOVE.size * count <= size)
+            ):
+                self.base = unpack_masks(BASE.unpack_from(header, BASE_OFFSET)[0])
+                self.count = count
+                self.position = position
+
+        self.map = None
+        self.capacity = 0
+        self.resize(max(INITIAL_CAPACITY, self.count))
+        self.write_header()
+
+    @property
+    def can_undo(self):
+        return self.position > 0
+
+    @property
+    def can_redo(self):
+        return self.position < self.count
+
+    def resize(self, capacity):
+        size = MOVES_OFFSET + MOVE.size * capacity
+        if self.map is not None:
+            self.map.close()
+
+        self.file.truncate(size)
+        self.map = mmap.mmap(self.file.fileno(), size)
+        self.capacity = capacity
+
+    def write_header(self):
+        HEADER.pack_into(self.map, 0, MAGIC, VERSION, MOVE.size)
+        BASE.pack_into(self.map, BASE_OFFSET, pack_masks(self.base))
+        self.write_position()
+
+    def write_position(self):
+        POSITION.pack_into(self.map, POSITION_OFFSET, self.count, self.position)
+
+    # Starts over from the given board
+    def reset(self, base):
+        self.base = list(base)
+        self.count = 0
+        self.position = 0
+        self.write_header()
+
+    def move(self, number):
+        return MOVE.unpack_from(self.map, MOVES_OFFSET + MOVE.size * number)
+
+    def moves(self, count=None):
+        return [self.move(number) for number in range(self.count if count is None else count)]
+
+    # Records a move at the current position, dropping the moves which were undone
+    def push(self, index, mask_old, mask_new, time):
+        if self.position >= self.capacity:
+            self.resize(self.capacity * 2)
+
+        # The move is written before the position, so that an interrupted push never exposes garbage
+        MOVE.pack_into(self.map, MOVES_OFFSET + MOVE.size * self.position, index, mask_old, mask_new, time)
+        self.position += 1
+        self.count = self.position
+        self.write_position()
+
+    # Returns the move to take back (its cell is to be set to the old mask), or None if there is none
+    def undo(self):
+        if self.position <= 0:
+            return None
+
+        self.position -= 1
+        self.write_position()
+        return self.move(self.position)
+
+    # Returns the move to make again (its cell is to be set to the new mask), or None if there is none
+    def redo(self):
+        if self.position >= self.count:
+            return None
+
+        move = self.move(self.position)
+        self.position += 1
+        self.write_position()
+        return move
+
+    # Moves to the given position, applying the moves undone or redone on the way to `board` (which must hold
+    # the board at the current position). Costs one set() per move passed, whatever the distance from the base
+    def seek(self, board, position):
+        position = max(0, min(position, self.count))
+
+        while self.position > position:
+            index, mask_old, _, _ = self.undo()
+            board.set(index, mask_old)
+
+        while self.position < position:
+            index, _, mask_new, _ = self.redo()
+            board.set(index, mask_new)
+
+        return board
+
+    # Board at the given position (the current one by default)
+    def board(self, position=None):
+        return replay(self.base, self.moves(self.position if position is None else position))
+
+    # Returns the first position at which the journal has the given board, or None if it never does.
+    # Raises ValueError like replay() if a move does not fit the state it is applied to
+    def find(self, board):
+        state = list(self.base)
+        target = list(board)
+        if state == target:
+            return 0
+
+        for number, (index, mask_old, mask_new, _) in enumerate(self.moves()):
+            if (index >= len(state)) or (state[index] != mask_old):
+                raise ValueError(f"Move {number} does not match the board")
+
+            state[index] = mask_new
+            if state == target:
+                return number + 1
+
+        return None
+
+    def flush(self):
+        self.map.flush()
+
+    def close(self):
+        self.map.flush()
+        self.map.close()
+        self.file.close()
+
+
+__all__ = ["replay", "MoveJournal"]
@@ -0,0 +1,107 @@
+import queue
+import threading
+
+import vsext
+from .difficulty import difficulties, targeted, in_range
+
+# Steps of every generate_targeted() call. The stop flag is checked between calls, so this bounds the time stop()
+# waits for; a search which has not reached the range by then starts over from a new puzzle on the next call
+TARGETED_LIMIT = 256
+
+
+# Generates puzzles on a background thread until the requested number of puzzles for every difficulty is reached.
+# Finished puzzles are posted to a thread-safe queue and collected by the owner of the producer via collect()
+class PuzzleProducer:
+    def __init__(self, ranges=difficulties, notify=None):
+        self.ranges = ranges
+        self.notify = notify  # called from the worker thread after a puzzle has been posted
+        self.solver = vsext.Solver()
+        self.results = queue.Queue()
+        self.demand = {key: 0 for key in ranges}
+        self.pending = {key: 0 for key in ranges}  # puzzles posted to the queue but not collected yet
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.stopping = threading.Event()
+        self.thread = None
+
+    @property
+    def running(self):
+        return (self.thread is not None) and self.thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+
+        self.stopping.clear()
+        self.thread = threading.Thread(target=self.run, name="PuzzleProducer", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if self.thread is None:
+            return
+
+        self.stopping.set()
+        self.wakeup.set()
+        self.thread.join()
+        self.thread = None
+
+    # Puzzles which have been generated but not collected yet count towards the given demand
+    def set_demand(self, demand):
+        with self.lock:
+            for key, count in demand.items():
+                self.demand[key] = max(count - self.pending[key], 0)
+
+        self.wakeup.set()
+
+    def collect(self):
+        results = []
+        while True:
+            try:
+                result = self.results.get_nowait()
+            except queue.Empty:
+                return results
+
+            with self.lock:
+                self.pending[result[0]] -= 1
+
+            results.append(result)
+
+    def take(self, score):
+        with self.lock:
+            for key, score_range in self.ranges.items():
+                if (self.demand[key] > 0) and in_range(score, score_range):
+                    self.demand[key] -= 1
+                    self.pending[key] += 1
+                    return key
+
+        return None
+
+    def run(self):
+        while not self.stopping.is_set():
+            with self.lock:
+                wanted = [key for key, count in self.demand.items() if count > 0]
+
+            if not wanted:
+                self.wakeup.wait()
+                self.wakeup.clear()
+                continue
+
+            # The solver releases the GIL, so this does not hold up the main thread. While a single difficulty is
+            # still wanted, puzzles are steered into its range instead of waiting for one to come up at random,
+            # provided that this is faster for it
+            if (len(wanted) == 1) and (wanted[0] in targeted):
+                score_min, score_max = self.ranges[wanted[0]]
+                board, score = self.solver.generate_targeted(score_min, score_max, TARGETED_LIMIT)
+            else:
+                board, score = self.solver.generate_once()
+
+            key = self.take(score)
+            if key is None:
+                continue
+
+            self.results.put((key, board, score))
+            if self.notify is not None:
+                self.notify()
+
+
+__all__ = ["TARGETED_LIMIT", "PuzzleProducer"]
@@ -0,0 +1,202 @@
+import os
+import time
+import zlib
+import struct
+import threading
+
+from .bank import pack_state, unpack_state
+
+# A snapshot is the header, the board as 9-bit cell masks (so that pencil marks are kept), the solution packed
+# like bank records and a CRC-32 of everything before it. The sequence number grows with every snapshot taken,
+# which tells whether a snapshot is older than a game saved elsewhere
+HEADER = struct.Struct("<4sHBQdI16s")  # magic, version, flags, sequence, timer, mistakes, difficulty (UTF-8)
+BOARD_SIZE = (81 * 9 + 7) // 8
+SOLUTION_SIZE = 41
+CHECKSUM = struct.Struct("<I")
+SNAPSHOT_SIZE = HEADER.size + BOARD_SIZE + SOLUTION_SIZE + CHECKSUM.size
+MAGIC = b"VSSV"
+VERSION = 2
+FLAG_GAME = 1  # the snapshot holds a game (otherwise the board and the solution are blank)
+
+
+def pack_masks(state):
+    packed = 0
+    for mask in reversed(list(state)):
+        if (mask < 0) or (mask > 0x1FF):
+            raise ValueError(f"Invalid cell mask: {mask}")
+
+        packed = (packed << 9) | mask
+
+    return packed.to_bytes(BOARD_SIZE, "little")
+
+
+def unpack_masks(data):
+    packed = int.from_bytes(data, "little")
+    return [(packed >> (9 * index)) & 0x1FF for index in range(81)]
+
+
+class GameSnapshot:
+    def __init__(self, difficulty="", board=None, solution=None, timer=0.0, mistakes=0, sequence=0):
+        self.difficulty = difficulty
+        self.board = board
+        self.solution = solution
+        self.timer = timer
+        self.mistakes = mistakes
+        self.sequence = sequence
+
+    def pack(self):
+        has_game = (self.board is not None) and (self.solution is not None)
+        header = HEADER.pack(
+            MAGIC, VERSION, FLAG_GAME if has_game else 0, self.sequence, self.timer, self.mistakes,
+            self.difficulty.encode()[:16]
+        )
+
+        if has_game:
+            data = header + pack_masks(self.board) + pack_state(self.solution)
+        else:
+            data = header + bytes(BOARD_SIZE + SOLUTION_SIZE)
+
+        return data + CHECKSUM.pack(zlib.crc32(data))
+
+    # Returns None unless `data` is a complete snapshot of the current version
+    @staticmethod
+    def unpack(data):
+        if len(data) != SNAPSHOT_SIZE:
+            return None
+
+        (checksum,) = CHECKSUM.unpack_from(data, SNAPSHOT_SIZE - CHECKSUM.size)
+        if checksum != zlib.crc32(data[:-CHECKSUM.size]):
+            return None
+
+        magic, version, flags, sequence, timer, mistakes, difficulty = HEADER.unpack_from(data)
+        if (magic != MAGIC) or (version != VERSION):
+            return None
+
+        snapshot = GameSnapshot(
+            difficulty.rstrip(b"\0").decode(errors="replace"), timer=timer, mistakes=mistakes, sequence=sequence
+        )
+        if flags & FLAG_GAME:
+            offset = HEADER.size
+            snapshot.board = unpack_masks(data[offset:offset + BOARD_SIZE])
+            snapshot.solution = unpack_state(data[offset + BOARD_SIZE:offset + BOARD_SIZE + SOLUTION_SIZE])
+
+        return snapshot
+
+
+# Replaces the file in one step, so that it holds either the old or the new data even if the process is killed
+def write_atomic(path, data):
+    temporary = path + ".tmp"
+    with open(temporary, "wb") as file:
+        file.write(data)
+        file.flush()
+        os.fsync(file.fileno())
+
+    os.replace(temporary, path)
+
+
+def read_snapshot(path):
+    try:
+        with open(path, "rb") as file:
+            return GameSnapshot.unpack(file.read())
+    except OSError:
+        return None
+
+
+# Writes snapshots to a file on a background thread. A snapshot given to save() is written once no other one
+# followed it for `delay` seconds (but no later than `max_delay` seconds after the first unwritten one), so that
+# bursts of moves cost one write; only the latest snapshot is kept. flush() has the pending snapshot written
+# right away and waits until it is, stop() writes it before returning.
+# `saved` tells whether the file holds the game: it is given for the file as it is, and afterwards it is whether
+# the last write succeeded. `on_error` (if given) is called from the writer thread with the error of a failed write
+class SnapshotWriter:
+    def __init__(self, path, delay=0.5, max_delay=2.0, saved=True, on_error=None):
+        self.path = path
+        self.delay = delay
+        self.max_delay = max_delay
+        self.saved = saved
+        self.on_error = on_error
+        self.condition = threading.Condition()
+        self.pending = None
+        self.first_time = 0.0
+        self.deadline = 0.0
+        self.stopping = False
+        self.writing = False  # whether a snapshot taken from `pending` is being written
+        self.error = None  # last error raised by a write, if any
+        self.thread = None
+
+    @property
+    def running(self):
+        return (self.thread is not None) and self.thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+
+        self.stopping = False
+        self.thread = threading.Thread(target=self.run, name="SnapshotWriter", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if self.thread is None:
+            return
+
+        with self.condition:
+            self.stopping = True
+            self.condition.notify()
+
+        self.thread.join()
+        self.thread = None
+
+    def save(self, data):
+        with self.condition:
+            now = time.monotonic()
+            if self.pending is None:
+                self.first_time = now
+
+            self.pending = data
+            self.deadline = min(now + self.delay, self.first_time + self.max_delay)
+            self.condition.notify()
+
+    def flush(self):
+        with self.condition:
+            self.deadline = 0.0
+            self.condition.notify_all()
+
+            while ((self.pending is not None) or self.writing) and self.running:
+                self.condition.wait()
+
+    def run(self):
+        while True:
+            with self.condition:
+                while (self.pending is None) and not self.stopping:
+                    self.condition.wait()
+
+                if self.pending is None:
+                    return
+
+                remaining = self.deadline - time.monotonic()
+                if (remaining > 0.0) and not self.stopping:
+                    self.condition.wait(remaining)
+                    continue
+
+                data, self.pending = self.pending, None
+                self.writing = True
+
+            try:
+                write_atomic(self.path, data)
+                self.error = None
+                self.saved = True
+            except OSError as error:
+                self.error = error
+                self.saved = False
+                if self.on_error is not None:
+                    self.on_error(error)
+
+            with self.condition:
+                self.writing = False
+                self.condition.notify_all()
+
+
+__all__ = [
+    "pack_masks", "unpack_masks", "GameSnapshot", "write_atomic", "read_snapshot", "SnapshotWriter"
+]
@@ -8,6 +8,7 @@ from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.screenmanager import Screen
 
 from common import AnimatedNumericProperty, AnimatedBoundedNumericProperty, ProxyLayout, OutlineButton
+from puzzles import BoardModel
 import vsext
 
 
@@ -18,6 +19,7 @@ class GridCell(OutlineButton, AnchorLayout):
     is_selected = properties.BooleanProperty(False)
     is_warning = properties.BooleanProperty(False)
     is_error = properties.BooleanProperty(False)
+    is_blocked = properties.BooleanProperty(False)
 
     text = properties.StringProperty("")
     text_scale = AnimatedNumericProperty(1.0, duration="animation_duration")
@@ -65,12 +67,15 @@ class PanelAction(OutlineButton, Label):
 class GameScreen(Screen):
     selection = properties.NumericProperty(None, allownone=True)
     selection_mask = properties.NumericProperty(0)  # possible values in selected cell
+    can_undo = properties.BooleanProperty(False)
+    can_redo = properties.BooleanProperty(False)
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
 
         self.cells = [None] * 81
         self.app = None
+        self.model = None
 
     def on_kv_post(self, base_widget):
         self.app = app.App.get_running_app()
@@ -93,26 +98,57 @@ class GameScreen(Screen):
     def on_enter(self):
         self.ids.assist.state = "down" if self.app.state.assist else "normal"
         self.app.timer()
+        self.model = BoardModel(self.app.state.board, self.app.state.solution)
         self.refresh()
+        self.update_history()
 
     def on_leave(self):
         self.app.timer.cancel()
 
-    def refresh(self):
-        conflicts = vsext.list_conflicts(self.app.state.board)
-        finished = True
+    # Updates the given cells (all of them by default) from the board model
+    def refresh(self, indexes=None):
+        for index in range(81) if indexes is None else indexes:
+            cell = self.cells[index]
+            cell.set_text(self.model.text(index))
+            cell.is_warning = self.model.is_warning(index)
+            cell.is_error = self.model.is_error(index)
+            cell.is_blocked = self.model.is_blocked(index)
 
-        for index, cell in enumerate(self.cells):
-            mask = self.app.state.board[index]
-            mask_ref = self.app.state.solution[index]
-            finished = finished and (mask == mask_ref)
-            cell.set_text(str(vsext.decode_mask(mask) + 1).replace("0", ""))
-            cell.is_warning = (vsext.bit_count(mask) == 1) and (mask != mask_ref)
-            cell.is_error = index in conflicts
-
-        if finished:
+        if self.model.finished:
             self.app.timer.cancel()
 
+    # The model shares the board with the app state, which is updated in place.
+    # Changes are recorded in the journal unless they come from it (undo, redo)
+    def set_cell(self, index, mask, record=True):
+        mask_old = self.app.state.board[index]
+        if record and (mask != mask_old):
+            self.app.journal.push(index, mask_old, mask, self.app.state.timer)
+
+        self.refresh(self.model.set(index, mask))
+        self.update_history()
+
+        # Moves elsewhere (undo, redo) may change what the selected cell allows
+        if self.selection is not None:
+            self.selection_mask = self.model.candidates(self.selection)
+
+    def update_history(self):
+        self.can_undo = self.app.journal.can_undo
+        self.can_redo = self.app.journal.can_redo
+
+    def undo(self):
+        move = self.app.journal.undo()
+        if move is not None:
+            index, mask_old, _, _ = move
+            self.set_cell(index, mask_old, record=False)
+            self.app.autosave()
+
+    def redo(self):
+        move = self.app.journal.redo()
+        if move is not None:
+            index, _, mask_new, _ = move
+            self.set_cell(index, mask_new, record=False)
+            self.app.autosave()
+
     def hint(self):
         if self.selection is None:
             options = [i for i, mask in enumerate(self.app.state.board) if vsext.bit_count(mask) != 1]
@@ -124,8 +160,8 @@ class GameScreen(Screen):
             index = self.selection
 
         self.cells[index].text = ""  # force the animation
-        self.app.state.board[index] = self.app.state.solution[index]
-        self.refresh()
+        self.set_cell(index, self.app.state.solution[index])
+        self.app.autosave()
 
     def put(self, mask):
         if self.selection is None:
@@ -133,13 +169,13 @@ class GameScreen(Screen):
 
         cell = self.cells[self.selection]
         cell.text = ""  # force the animation
-
-        self.app.state.board[self.selection] = mask
-        self.refresh()
+        self.set_cell(self.selection, mask)
 
         if cell.is_error or (cell.is_warning and self.app.state.assist):
             self.app.state.mistakes += 1
 
+        self.app.autosave()
+
     def select(self, index):
         if self.selection is not None:
             self.cells[self.selection].is_selected = False
@@ -147,7 +183,7 @@ class GameScreen(Screen):
         if (index is not None) and (index != self.selection):
             self.cells[index].is_selected = True
             self.selection = index
-            self.selection_mask = vsext.list_candidates(self.app.state.board, index)
+            self.selection_mask = self.model.candidates(index)
         else:
             self.selection = None
             self.selection_mask = 0
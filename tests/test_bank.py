@@ -0,0 +1,64 @@
+import vsext
+from puzzles import PuzzleBank, BankFile, pack_state, unpack_state
+from puzzles.bank import RECORD
+
+
+def make_puzzles(count):
+    solver = vsext.Solver(seed=1)
+    return [solver.generate_once() for _ in range(count)]
+
+
+def test_state_round_trip():
+    for state, _ in make_puzzles(3):
+        data = pack_state(state)
+        assert len(data) == RECORD.size - 2
+        assert unpack_state(data) == state
+
+
+def test_push_pop(tmp_path):
+    puzzles = make_puzzles(3)
+    bank = BankFile(str(tmp_path / "easy.bank"), 2)
+
+    assert bank.push(*puzzles[0])
+    assert bank.push(*puzzles[1])
+    assert not bank.push(*puzzles[2])
+
+    assert bank.pop() == puzzles[1]
+    assert bank.pop() == puzzles[0]
+    assert bank.pop() is None
+    bank.close()
+
+
+def test_reopen(tmp_path):
+    puzzles = make_puzzles(4)
+    keys = ["easy", "hard"]
+
+    bank = PuzzleBank(str(tmp_path), keys, {"easy": 4, "hard": 2})
+    for puzzle in puzzles[:3]:
+        bank.push("easy", *puzzle)
+
+    bank.push("hard", *puzzles[3])
+    bank.close()
+
+    bank = PuzzleBank(str(tmp_path), keys, {"easy": 4, "hard": 2})
+    assert (bank.count("easy"), bank.free("easy")) == (3, 1)
+    assert (bank.count("hard"), bank.free("hard")) == (1, 1)
+    assert bank.pop("hard") == puzzles[3]
+    assert bank.pop("easy") == puzzles[2]
+    bank.close()
+
+    # Puzzles beyond a smaller capacity are dropped
+    bank = PuzzleBank(str(tmp_path), keys, 1)
+    assert bank.count("easy") == 1
+    assert bank.is_full("easy") and not bank.is_full("hard")
+    assert bank.pop("easy") == puzzles[0]
+    bank.close()
+
+
+def test_reopen_damaged(tmp_path):
+    path = tmp_path / "easy.bank"
+    path.write_bytes(b"garbage!" * 4)
+
+    bank = BankFile(str(path), 2)
+    assert bank.count == 0
+    bank.close()
@@ -0,0 +1,97 @@
+import random
+
+import vsext
+from puzzles import BoardModel
+
+FULL = vsext.encode_mask(-1)
+
+
+def random_state(rng, filled):
+    state = [FULL] * 81
+    for index in rng.sample(range(81), filled):
+        state[index] = vsext.encode_mask(rng.randrange(9))
+
+    return state
+
+
+def random_mask(rng):
+    choice = rng.random()
+    if choice < 0.5:
+        return vsext.encode_mask(rng.randrange(9))
+    elif choice < 0.8:
+        return FULL
+
+    return rng.randrange(1, FULL)  # pencil marks
+
+
+def assert_matches(board, state):
+    assert list(board) == state
+    assert set(board.conflicts()) == vsext.list_conflicts(state)
+    assert board.conflict_count == len(vsext.list_conflicts(state))
+    assert list(board.all_candidates()) == vsext.list_all_candidates(state)
+
+    for index in range(81):
+        assert board.candidates(index) == vsext.list_candidates(state, index)
+        assert board.is_conflict(index) == (index in vsext.list_conflicts(state))
+
+
+def test_board_matches_list_functions():
+    rng = random.Random(1)
+    for filled in (0, 20, 40, 81):
+        state = random_state(rng, filled)
+        board = vsext.Board(state)
+        assert_matches(board, state)
+
+        for _ in range(200):
+            index = rng.randrange(81)
+            mask = random_mask(rng)
+            conflicts = vsext.list_conflicts(state)
+
+            state[index] = mask
+            changed = board.set(index, mask)
+
+            assert set(changed) == conflicts ^ vsext.list_conflicts(state)
+            assert_matches(board, state)
+
+
+def test_board_is_accepted_in_place_of_lists():
+    solver = vsext.Solver(seed=1)
+    state = solver.generate_once()[0]
+    board = vsext.Board(state)
+
+    assert solver.solve(board) == solver.solve(state)
+    assert solver.count_solutions(board) == solver.count_solutions(state) == 1
+    assert vsext.grade(board) == vsext.grade(state)
+    assert vsext.encode_state(board) == vsext.encode_state(state)
+    assert vsext.Board(board).tolist() == state
+
+
+def test_model_reports_changed_cells():
+    rng = random.Random(2)
+    solver = vsext.Solver(seed=2)
+    puzzle = solver.generate_once()[0]
+    solution = solver.solve(puzzle)[0][0]
+    model = BoardModel(puzzle, solution)
+
+    def view():
+        return [
+            (model.text(index), model.is_warning(index), model.is_error(index), model.is_blocked(index))
+            for index in range(81)
+        ]
+
+    for _ in range(300):
+        before = view()
+        index = rng.randrange(81)
+        changed = model.set(index, random_mask(rng))
+        after = view()
+
+        assert changed[0] == index
+        assert {i for i in range(81) if before[i] != after[i]} <= set(changed)
+        assert model.blocked == model.find_blocked()
+        assert model.correct == sum(mask == solution[i] for i, mask in enumerate(model.board))
+
+    for index in range(81):
+        model.set(index, solution[index])
+
+    assert model.finished
+    assert not any(model.is_error(index) or model.is_blocked(index) for index in range(81))
@@ -0,0 +1,54 @@
+import itertools
+
+import pytest
+
+import vsext
+from benchmarks.suite import load_corpus
+
+ENGINES = ["groups", "bitboard", "dlx"]
+BOARDS = [board for name in ("easy", "hard", "pathological") for board in load_corpus(name)]
+
+
+@pytest.mark.parametrize("engine", ENGINES[1:])
+def test_engines_agree(engine):
+    reference = vsext.Solver("groups")
+    solver = vsext.Solver(engine)
+
+    for board in BOARDS:
+        expected = reference.solve(board, False, 20)
+        results = solver.solve(board, False, 20)
+
+        # The solutions of a board with more than the limit depend on the order of the search
+        if len(expected) < 20:
+            assert sorted(results) == sorted(expected)
+
+        assert solver.count_solutions(board, 5) == reference.count_solutions(board, 5)
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_iter_solutions_matches_solve(engine):
+    solver = vsext.Solver(engine)
+    for board in BOARDS:
+        assert list(itertools.islice(solver.iter_solutions(board), 3)) == solver.solve(board, False, 3)
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_seeded_generation_repeats(engine):
+    first = vsext.Solver(engine, seed=7, stream=1)
+    second = vsext.Solver(engine, seed=7, stream=1)
+    puzzles = [first.generate_once() for _ in range(3)]
+
+    assert [second.generate_once() for _ in range(3)] == puzzles
+    for puzzle, score in puzzles:
+        assert first.solve(puzzle) == [(first.solve(puzzle)[0][0], score)]
+
+
+@pytest.mark.parametrize("order", vsext.orders)
+def test_orders(order):
+    solver = vsext.Solver("bitboard", order=order, seed=1)
+    empty = [vsext.encode_mask(-1, order)] * order ** 4
+    solution = solver.solve(empty, True, 1)[0][0]
+
+    assert solver.count_solutions(solution) == 1
+    assert vsext.list_conflicts(solution) == set()
+    assert vsext.decode_state(vsext.encode_state(solution)) == solution
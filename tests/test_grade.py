@@ -0,0 +1,53 @@
+import vsext
+from benchmarks.suite import load_corpus
+
+FULL = vsext.encode_mask(-1)
+
+
+def make_solution():
+    return vsext.Solver(seed=1).solve([FULL] * 81, True, 1)[0][0]
+
+
+def test_solved_board():
+    histogram, rating, solved = vsext.grade(make_solution())
+    assert tuple(histogram) == vsext.techniques
+    assert sum(histogram.values()) == 0
+    assert (rating, solved) == (0, True)
+
+
+def test_single_missing_cell():
+    board = make_solution()
+    board[40] = FULL
+
+    histogram, rating, solved = vsext.grade(board)
+    assert solved
+    assert histogram["hidden_single"] == 1
+    assert sum(histogram.values()) == 1
+
+
+def test_singles_only_puzzle():
+    histogram, rating, solved = vsext.grade(load_corpus("easy")[0])
+    assert solved
+    assert set(key for key, count in histogram.items() if count > 0) <= {"hidden_single", "naked_single"}
+
+
+def test_unsolved_puzzles():
+    # Conflicting clues, and an empty grid which the techniques cannot even start on
+    histogram, rating, solved = vsext.grade([vsext.encode_mask(0)] * 2 + [FULL] * 79)
+    assert not solved
+
+    histogram, rating, solved = vsext.grade([FULL] * 81)
+    assert not solved
+    assert sum(histogram.values()) == 0
+    assert rating > 0
+
+
+def test_solved_puzzles_have_their_solution():
+    solver = vsext.Solver()
+    for name in ("easy", "hard"):
+        for board in load_corpus(name):
+            grade = vsext.grade(board)
+            assert grade == vsext.grade(vsext.Board(board))
+
+            if grade[2]:
+                assert solver.count_solutions(board) == 1
@@ -0,0 +1,151 @@
+import random
+
+import pytest
+
+import vsext
+from puzzles import MoveJournal, replay
+from puzzles.journal import INITIAL_CAPACITY
+
+
+def make_base():
+    return vsext.Solver(seed=1).generate_once()[0]
+
+
+# Plays random moves on `board`, recording them in the journal, and returns the boards after every move
+def play(journal, board, count, rng):
+    boards = []
+    for _ in range(count):
+        index = rng.randrange(81)
+        mask_old = board[index]
+        mask_new = rng.choice([vsext.encode_mask(rng.randrange(9)), vsext.encode_mask(-1), 0b11])
+        journal.push(index, mask_old, mask_new, float(len(boards)))
+        board.set(index, mask_new)
+        boards.append(list(board))
+
+    return boards
+
+
+def test_push_undo_redo(tmp_path):
+    rng = random.Random(1)
+    base = make_base()
+    board = vsext.Board(base)
+
+    journal = MoveJournal(str(tmp_path / "game.journal"))
+    journal.reset(base)
+    boards = [base] + play(journal, board, 20, rng)
+
+    for position in range(20, 0, -1):
+        assert journal.position == position
+        index, mask_old, _, _ = journal.undo()
+        board.set(index, mask_old)
+        assert list(board) == boards[position - 1]
+
+    assert journal.undo() is None
+    assert not journal.can_undo and journal.can_redo
+
+    for position in range(1, 21):
+        index, _, mask_new, _ = journal.redo()
+        board.set(index, mask_new)
+        assert list(board) == boards[position]
+
+    assert journal.redo() is None
+    journal.close()
+
+
+def test_push_drops_undone_moves(tmp_path):
+    rng = random.Random(2)
+    base = make_base()
+    board = vsext.Board(base)
+
+    journal = MoveJournal(str(tmp_path / "game.journal"))
+    journal.reset(base)
+    play(journal, board, 10, rng)
+    journal.seek(board, 4)
+
+    boards = play(journal, board, 3, rng)
+    assert (journal.position, journal.count) == (7, 7)
+    assert not journal.can_redo
+    assert list(journal.board()) == boards[-1]
+    journal.close()
+
+
+def test_seek_and_find(tmp_path):
+    rng = random.Random(3)
+    base = make_base()
+    board = vsext.Board(base)
+
+    journal = MoveJournal(str(tmp_path / "game.journal"))
+    journal.reset(base)
+    boards = [base] + play(journal, board, 30, rng)
+
+    for position in (0, 30, 12, 29, 1, 15):
+        journal.seek(board, position)
+        assert journal.position == position
+        assert list(board) == boards[position]
+        assert list(journal.board()) == boards[position]
+        assert journal.find(boards[position]) == boards.index(boards[position])
+
+    assert journal.find([0] * 81) is None
+    journal.close()
+
+
+def test_reopen(tmp_path):
+    rng = random.Random(4)
+    path = str(tmp_path / "game.journal")
+    base = make_base()
+    board = vsext.Board(base)
+
+    # Enough moves to grow the file past its initial capacity
+    journal = MoveJournal(path)
+    journal.reset(base)
+    boards = play(journal, board, INITIAL_CAPACITY + 10, rng)
+    journal.seek(board, INITIAL_CAPACITY)
+    moves = journal.moves()
+    journal.close()
+
+    journal = MoveJournal(path)
+    assert journal.base == base
+    assert (journal.position, journal.count) == (INITIAL_CAPACITY, INITIAL_CAPACITY + 10)
+    assert journal.moves() == moves
+    assert list(journal.board()) == boards[INITIAL_CAPACITY - 1]
+    assert list(journal.board(journal.count)) == boards[-1]
+    journal.close()
+
+
+def test_reopen_damaged(tmp_path):
+    path = tmp_path / "game.journal"
+    path.write_bytes(b"garbage")
+
+    journal = MoveJournal(str(path))
+    assert (journal.position, journal.count) == (0, 0)
+    journal.close()
+
+
+def test_replay_checks_moves():
+    base = make_base()
+    index = base.index(vsext.encode_mask(-1))
+    value = vsext.encode_mask(0)
+
+    assert replay(base, [(index, base[index], value, 0.0)])[index] == value
+
+    with pytest.raises(ValueError):
+        replay(base, [(index, value, base[index], 0.0)])
+
+
+def test_find_checks_moves(tmp_path):
+    base = make_base()
+    index = base.index(vsext.encode_mask(-1))
+    value = vsext.encode_mask(0)
+
+    journal = MoveJournal(str(tmp_path / "game.journal"))
+    journal.reset(base)
+    journal.push(index, value, base[index], 0.0)  # does not start from the base
+    with pytest.raises(ValueError):
+        journal.find([0] * 81)
+
+    journal.reset(base)
+    journal.push(200, 0, value, 0.0)  # no such cell
+    with pytest.raises(ValueError):
+        journal.find([0] * 81)
+
+    journal.close()
@@ -0,0 +1,59 @@
+from common.profiling import Profiler
+
+
+class Counter:
+    def __init__(self):
+        self.calls = 0
+
+    def step(self, amount=1):
+        self.calls += amount
+        return self.calls
+
+
+def test_install_counts_calls():
+    profiler = Profiler()
+    original = Counter.__dict__["step"]
+    profiler.install(Counter, "step")
+
+    try:
+        counter = Counter()
+        assert counter.step() == 1
+        assert counter.step(amount=2) == 3
+        assert Counter.step.__name__ == "step"
+
+        record = profiler.records["Counter.step"]
+        assert record.count == 2
+        assert record.total >= record.maximum > 0.0
+        assert "Counter.step" in profiler.report()
+    finally:
+        profiler.uninstall()
+
+    assert Counter.__dict__["step"] is original
+    assert profiler.installed == []
+
+
+def test_reset_keeps_counting():
+    profiler = Profiler()
+    profiler.install(Counter, "step")
+
+    try:
+        counter = Counter()
+        counter.step()
+        profiler.reset()
+
+        record = profiler.records["Counter.step"]
+        assert (record.count, record.total, record.maximum) == (0, 0.0, 0.0)
+
+        counter.step()
+        assert profiler.records["Counter.step"].count == 1
+    finally:
+        profiler.uninstall()
+
+
+def test_uninstalled_methods_are_not_counted():
+    profiler = Profiler()
+    profiler.install(Counter, "step")
+    profiler.uninstall()
+
+    Counter().step()
+    assert profiler.records["Counter.step"].count == 0
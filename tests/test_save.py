@@ -0,0 +1,100 @@
+import os
+
+import vsext
+from puzzles import GameSnapshot, SnapshotWriter, read_snapshot, pack_masks, unpack_masks
+from puzzles.save import SNAPSHOT_SIZE
+
+
+def make_game():
+    solver = vsext.Solver(seed=1)
+    puzzle = solver.generate_once()[0]
+    solution = solver.solve(puzzle)[0][0]
+
+    board = vsext.Board(puzzle)
+    board.set(puzzle.index(vsext.encode_mask(-1)), 0b101)  # pencil marks
+    return board, solution
+
+
+def test_masks_round_trip():
+    state = [index % 0x200 for index in range(0, 81 * 7, 7)]
+    assert unpack_masks(pack_masks(state)) == state
+
+
+def test_snapshot_round_trip():
+    board, solution = make_game()
+    data = GameSnapshot("hard", board, solution, 123.5, 4, 2 ** 40).pack()
+    assert len(data) == SNAPSHOT_SIZE
+
+    snapshot = GameSnapshot.unpack(data)
+    assert snapshot.difficulty == "hard"
+    assert snapshot.board == list(board)
+    assert snapshot.solution == solution
+    assert snapshot.timer == 123.5
+    assert snapshot.mistakes == 4
+    assert snapshot.sequence == 2 ** 40
+
+
+def test_snapshot_without_game():
+    snapshot = GameSnapshot.unpack(GameSnapshot("easy", timer=1.0).pack())
+    assert (snapshot.board is None) and (snapshot.solution is None)
+    assert snapshot.difficulty == "easy"
+
+
+def test_snapshot_rejects_damaged_data():
+    board, solution = make_game()
+    data = GameSnapshot("normal", board, solution).pack()
+
+    for offset in (0, 10, SNAPSHOT_SIZE // 2, SNAPSHOT_SIZE - 1):
+        damaged = bytearray(data)
+        damaged[offset] ^= 0x01
+        assert GameSnapshot.unpack(bytes(damaged)) is None
+
+    assert GameSnapshot.unpack(data[:-1]) is None
+    assert GameSnapshot.unpack(data + b"\0") is None
+
+
+def test_read_snapshot(tmp_path):
+    path = str(tmp_path / "game.sav")
+    assert read_snapshot(path) is None
+
+    with open(path, "wb") as file:
+        file.write(b"garbage")
+
+    assert read_snapshot(path) is None
+
+
+def test_writer_flush_and_stop(tmp_path):
+    path = str(tmp_path / "game.sav")
+    board, solution = make_game()
+    writer = SnapshotWriter(path, delay=60.0, max_delay=60.0, saved=False)
+    writer.start()
+
+    try:
+        # Later snapshots replace pending ones, flush() returns once the latest one is written
+        writer.save(GameSnapshot("easy", board, solution, 1.0).pack())
+        writer.save(GameSnapshot("easy", board, solution, 2.0).pack())
+        writer.flush()
+        assert writer.saved
+        assert read_snapshot(path).timer == 2.0
+
+        writer.save(GameSnapshot("easy", board, solution, 3.0).pack())
+    finally:
+        writer.stop()
+
+    assert read_snapshot(path).timer == 3.0
+    assert not os.path.exists(path + ".tmp")
+
+
+def test_writer_reports_failed_writes(tmp_path):
+    errors = []
+    writer = SnapshotWriter(str(tmp_path / "missing" / "game.sav"), on_error=errors.append)
+    writer.start()
+
+    try:
+        writer.save(GameSnapshot().pack())
+        writer.flush()
+        assert not writer.saved
+        assert isinstance(writer.error, OSError)
+        assert errors == [writer.error]
+    finally:
+        writer.stop()
@@ -9,7 +9,7 @@ except ModuleNotFoundError:
         sources=["vsext.cpp"],
         language="c++",
         extra_compile_args=["-std=c++20"],
-        extra_link_args=["-std=c++20"]
+        extra_link_args=["-std=c++20", "-pthread"]
     )]
 
 setup(
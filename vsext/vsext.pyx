@@ -1,52 +1,632 @@
 # distutils: language = c++
 # distutils: extra_compile_args = -std=c++20
+# distutils: extra_link_args = -pthread
 
 from libcpp.vector cimport vector
+from libcpp.string cimport string
+from libcpp.memory cimport unique_ptr
 from libcpp.utility cimport pair
 from libcpp.unordered_set cimport unordered_set
+from libc.stdint cimport uint8_t, uint16_t, uint64_t
+from cpython.bytes cimport PyBytes_FromStringAndSize, PyBytes_AS_STRING
+from cpython.buffer cimport PyBUF_WRITABLE
+
+
+cdef extern from "<mutex>" namespace "std" nogil:
+    cdef cppclass mutex:
+        void lock()
+        void unlock()
 
 
 cdef extern from "vsext_impl.cpp":
-    const int SIZE_1
-    const int SIZE_2
-    const int MASK_FULL
+    const int ORDER_MIN
+    const int ORDER_MAX
+    const char* VALUE_CHARS
     const int SCORE_STEP
 
-    cdef cppclass SolverImpl "Solver":
-        SolverImpl() except +
-        vector[pair[vector[int], int]] solve(const vector[int]& initial, bint randomize, int limit) except +
-        pair[vector[int], int] generate_once() except +
-        pair[vector[int], int] generate(int score_min, int score_max, int limit) except +
+    const int PHASES
+    const char* const PHASE_NAMES[]
+
+    cdef cppclass SearchStats:
+        SearchStats() nogil
+        long long nodes
+        long long guesses
+        long long backtracks
+        long long propagations
+        long long contradictions
+        long long solutions
+        int max_depth
+        vector[double] seconds
+        vector[int] path
+
+    cdef cppclass StateView:
+        StateView() nogil
+        StateView(const vector[int]& state) nogil
+        StateView(const uint16_t* masks, size_t size) nogil
+        size_t size() nogil
+
+    cdef cppclass SolverImpl "SolverBase":
+        vector[pair[vector[int], int]] solve(const StateView& initial, bint randomize, int limit) except + nogil
+        int count_solutions(const StateView& initial, int cap) except + nogil
+        pair[vector[int], int] generate_once() except + nogil
+        pair[vector[int], int] generate(int score_min, int score_max, int limit) except + nogil
+        pair[vector[int], int] generate_targeted(int score_min, int score_max, int limit) except + nogil
+        void reseed(uint64_t seed, uint64_t stream) nogil
+        void set_stats(SearchStats* stats) nogil
+        bint begin(const StateView& initial, bint randomize) except + nogil
+        bint next() except + nogil
+        void end() nogil
+        pair[vector[int], int] solution() except + nogil
+
+    unique_ptr[SolverImpl] make_solver(const string& engine, int order) except +
+    uint64_t random_seed() except +
+    long long allocation_count()
+
+    vector[vector[pair[vector[int], int]]] solve_many_impl "solve_many"(
+        const vector[vector[int]]& boards, int limit, int workers, const string& engine, int order
+    ) except + nogil
 
     inline int bit_length_impl "bit_length"(int x);
     inline int bit_count_impl "bit_count"(int x);
 
-    unordered_set[int] list_conflicts_impl "list_conflicts"(const vector[int]& state) except +
-    int list_candidates_impl "list_candidates"(const vector[int]& state, int index) except +
+    unordered_set[int] list_conflicts_impl "list_conflicts"(const StateView& state) except +
+    void mark_conflicts_many(const uint16_t* states, size_t count, uint8_t* out, int order) except + nogil
+    long decode_states_impl "decode_states"(const char* data, size_t size, uint16_t* out, int order) except + nogil
+    bint encode_states_impl "encode_states"(const uint16_t* states, size_t count, char* out, int order) except + nogil
+    int order_of(size_t size)
+    int list_candidates_impl "list_candidates"(const StateView& state, int index) except +
+    vector[int] list_all_candidates_impl "list_all_candidates"(const StateView& state) except +
 
+    cdef cppclass BoardImpl "BoardBase":
+        int size()
+        const uint16_t* data()
+        vector[int] state() except +
+        void load(const StateView& state) except +
+        bint set(int index, int mask, vector[int]& changed) except +
+        int candidates(int index)
+        const uint16_t* candidate_data()
+        bint conflicted(int index)
+        int conflict_count()
 
-score_step = SCORE_STEP
+    unique_ptr[BoardImpl] make_board(int order) except +
 
+    const int TECHNIQUES
+    const char* const TECHNIQUE_NAMES[]
 
-cdef class Solver:
-    cdef SolverImpl solver
+    cdef cppclass Grade:
+        vector[int] histogram
+        int rating
+        bint solved
 
-    def solve(self, initial: list[int], randomize: bool = False, limit: int = 2) -> list[tuple[list[int], int]]:
-        return self.solver.solve(initial, randomize, limit)
+    Grade grade_impl "grade"(const StateView& state) except + nogil
+
+
+orders = tuple(range(ORDER_MIN, ORDER_MAX + 1))
+value_chars = VALUE_CHARS.decode()
+score_step = SCORE_STEP
+phases = tuple(PHASE_NAMES[i].decode() for i in range(PHASES))
+techniques = tuple(TECHNIQUE_NAMES[i].decode() for i in range(TECHNIQUES))
+
+
+# Solves grids of the given order (2 to 5, i.e. 4x4 to 25x25 cells) with masks of order ** 2 bits.
+# The GIL is released while searching; the lock keeps the underlying solver from being used by two threads at once.
+# Propagation engines ("groups", "bitboard") differ only in speed, producing identical results.
+# The exact cover engine ("dlx") finds the same solutions in a different order and is faster at enumerating many of them.
+# Its solutions are scored by the bitboard engine, so scores match those of the other engines unless randomized.
+# Randomized searches and generation follow the sequence given by (seed, stream): a solver with the same engine, order,
+# seed and stream repeats the same calls with the same results. Without a seed, one is drawn from the system.
+# Different streams of one seed are independent, e.g. one per parallel worker.
+# With stats=True, search counters and phase times add up over all calls until reset_stats() (see the stats property)
+cdef class Solver:
+    cdef unique_ptr[SolverImpl] solver
+    cdef string engine
+    cdef readonly int order
+    cdef readonly uint64_t seed
+    cdef readonly uint64_t stream
+    cdef SearchStats stats_impl
+    cdef bint stats_enabled
+    cdef mutex lock
+
+    def __cinit__(
+        self, engine: str = "groups", order: int = 3, seed: int | None = None, stream: int = 0, stats: bool = False
+    ):
+        self.engine = engine.encode()
+        self.order = order
+        self.solver = make_solver(self.engine, self.order)
+        self.reseed(seed, stream)
+        self.stats_enabled = stats
+
+        if self.stats_enabled:
+            self.solver.get().set_stats(&self.stats_impl)
+
+    def reseed(self, seed: int | None = None, stream: int = 0):
+        cdef uint64_t seed_impl = random_seed() if seed is None else seed
+        cdef uint64_t stream_impl = stream
+
+        with nogil:
+            self.lock.lock()
+            self.solver.get().reseed(seed_impl, stream_impl)
+            self.lock.unlock()
+
+        self.seed = seed_impl
+        self.stream = stream_impl
+
+    # Counters collected since the solver was created or reset_stats() was called, None if stats are disabled.
+    # "path" lists the indexes of the cells guessed on the way to the last solution found
+    @property
+    def stats(self) -> dict | None:
+        if not self.stats_enabled:
+            return None
+
+        with nogil:
+            self.lock.lock()
+
+        try:
+            return {
+                "nodes": self.stats_impl.nodes,
+                "guesses": self.stats_impl.guesses,
+                "backtracks": self.stats_impl.backtracks,
+                "propagations": self.stats_impl.propagations,
+                "contradictions": self.stats_impl.contradictions,
+                "solutions": self.stats_impl.solutions,
+                "max_depth": self.stats_impl.max_depth,
+                "seconds": {phases[i]: self.stats_impl.seconds[i] for i in range(PHASES)},
+                "path": self.stats_impl.path,
+            }
+        finally:
+            self.lock.unlock()
+
+    def reset_stats(self):
+        with nogil:
+            self.lock.lock()
+            self.stats_impl = SearchStats()
+            self.lock.unlock()
+
+    def solve(self, initial: list[int] | Board, randomize: bool = False, limit: int = 2) -> list[tuple[list[int], int]]:
+        cdef vector[int] storage
+        cdef StateView initial_impl = state_view(initial, storage)
+        cdef bint randomize_impl = randomize
+        cdef int limit_impl = limit
+        cdef vector[pair[vector[int], int]] result
+
+        with nogil:
+            self.lock.lock()
+            try:
+                result = self.solver.get().solve(initial_impl, randomize_impl, limit_impl)
+            finally:
+                self.lock.unlock()
+
+        return result
+
+    def count_solutions(self, initial: list[int] | Board, cap: int = 2) -> int:
+        cdef vector[int] storage
+        cdef StateView initial_impl = state_view(initial, storage)
+        cdef int cap_impl = cap
+        cdef int result
+
+        with nogil:
+            self.lock.lock()
+            try:
+                result = self.solver.get().count_solutions(initial_impl, cap_impl)
+            finally:
+                self.lock.unlock()
+
+        return result
+
+    def iter_solutions(self, initial: list[int] | Board, randomize: bool = False) -> SolutionIterator:
+        return SolutionIterator(self, initial, randomize)
 
     def generate_once(self) -> tuple[list[int], int]:
-        return self.solver.generate_once()
+        cdef pair[vector[int], int] result
+
+        with nogil:
+            self.lock.lock()
+            try:
+                result = self.solver.get().generate_once()
+            finally:
+                self.lock.unlock()
+
+        return result
 
     def generate(self, score_min: int, score_max: int, limit: int) -> tuple[list[int], int]:
-        return self.solver.generate(score_min, score_max, limit)
+        cdef int score_min_impl = score_min
+        cdef int score_max_impl = score_max
+        cdef int limit_impl = limit
+        cdef pair[vector[int], int] result
+
+        with nogil:
+            self.lock.lock()
+            try:
+                result = self.solver.get().generate(score_min_impl, score_max_impl, limit_impl)
+            finally:
+                self.lock.unlock()
+
+        return result
+
+    def generate_targeted(self, score_min: int, score_max: int, limit: int) -> tuple[list[int], int]:
+        cdef int score_min_impl = score_min
+        cdef int score_max_impl = score_max
+        cdef int limit_impl = limit
+        cdef pair[vector[int], int] result
+
+        with nogil:
+            self.lock.lock()
+            try:
+                result = self.solver.get().generate_targeted(score_min_impl, score_max_impl, limit_impl)
+            finally:
+                self.lock.unlock()
+
+        return result
+
+
+# Lazily yields (cells, score) for every solution of a board, resuming the search where it left off on each step.
+# Uses a solver of its own, so that iteration does not interfere with other uses of the Solver that created it.
+# That solver starts from the seed and stream of the Solver, and adds to its stats (if enabled) under its lock
+cdef class SolutionIterator:
+    cdef unique_ptr[SolverImpl] solver
+    cdef Solver owner
+    cdef mutex lock
+    cdef bint active
+
+    def __cinit__(self, Solver owner, initial: list[int] | Board, randomize: bool):
+        cdef vector[int] storage
+        cdef StateView initial_impl = state_view(initial, storage)
+        cdef bint randomize_impl = randomize
+
+        self.owner = owner
+        self.solver = make_solver(owner.engine, owner.order)
+        self.solver.get().reseed(owner.seed, owner.stream)
+
+        if owner.stats_enabled:
+            self.solver.get().set_stats(&owner.stats_impl)
+
+        with nogil:
+            self.acquire()
+            try:
+                self.active = self.solver.get().begin(initial_impl, randomize_impl)
+            finally:
+                self.release()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> tuple[list[int], int]:
+        cdef bint found = False
+        cdef pair[vector[int], int] result
+
+        with nogil:
+            self.acquire()
+            try:
+                if self.active:
+                    found = self.active = self.solver.get().next()
+                if found:
+                    result = self.solver.get().solution()
+            finally:
+                self.release()
+
+        if not found:
+            raise StopIteration
+
+        return result
+
+    def close(self):
+        with nogil:
+            self.acquire()
+            self.solver.get().end()
+            self.active = False
+            self.release()
+
+    # Locks the iterator, and the Solver as well while the search adds to its stats
+    cdef void acquire(self) noexcept nogil:
+        self.lock.lock()
+        if self.owner.stats_enabled:
+            self.owner.lock.lock()
+
+    cdef void release(self) noexcept nogil:
+        if self.owner.stats_enabled:
+            self.owner.lock.unlock()
+        self.lock.unlock()
+
+
+def solve_many(
+    boards: list[list[int]], limit: int = 2, workers: int = 0, engine: str = "groups", order: int = 3
+) -> list[list[tuple[list[int], int]]]:
+    cdef vector[vector[int]] boards_impl = boards
+    cdef int limit_impl = limit
+    cdef int workers_impl = workers
+    cdef string engine_impl = engine.encode()
+    cdef int order_impl = order
+    cdef vector[vector[pair[vector[int], int]]] result
+
+    with nogil:
+        result = solve_many_impl(boards_impl, limit_impl, workers_impl, engine_impl, order_impl)
+
+    return result
+
+
+# Two-dimensional (N, cells) array exposing the buffer protocol, so that it can be wrapped without copying
+# (e.g. by numpy.asarray() or memoryview()); holds either cell masks (uint16, up to order 4) or per-cell flags (bool)
+cdef class StateArray:
+    cdef vector[uint8_t] data
+    cdef Py_ssize_t shape[2]
+    cdef Py_ssize_t strides[2]
+    cdef Py_ssize_t itemsize
+    cdef bytes format
+
+    def __cinit__(self, Py_ssize_t count, format: str = "H", Py_ssize_t cells = 81):
+        if format not in ("H", "?"):
+            raise ValueError(f"Unsupported format: {format}")
+
+        self.format = format.encode()
+        self.itemsize = 2 if format == "H" else 1
+        self.shape[0] = count
+        self.shape[1] = cells
+        self.strides[0] = cells * self.itemsize
+        self.strides[1] = self.itemsize
+        self.data.resize(count * cells * self.itemsize, 0)
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __getbuffer__(self, Py_buffer* buffer, int flags):
+        buffer.buf = self.data.data()
+        buffer.obj = self
+        buffer.len = self.data.size()
+        buffer.readonly = 0
+        buffer.itemsize = self.itemsize
+        buffer.format = self.format
+        buffer.ndim = 2
+        buffer.shape = self.shape
+        buffer.strides = self.strides
+        buffer.suboffsets = NULL
+        buffer.internal = NULL
+
+    def __releasebuffer__(self, Py_buffer* buffer):
+        pass
+
+    def tolist(self) -> list[list]:
+        return memoryview(self).tolist()
+
+
+# Cell masks of a game in 16 bits per cell (orders 2 to 4), exposed read-only through the buffer protocol.
+# Conflicts and candidates of all cells are maintained on every set(), so reading them costs no search over the board.
+# Accepted by the solver functions in place of lists, which read its masks without copying them (see state_view())
+cdef class Board:
+    cdef unique_ptr[BoardImpl] board
+    cdef vector[int] changed
+    cdef readonly int order
+    cdef object conflicts_cache
+    cdef object candidates_cache
+    cdef Py_ssize_t shape[1]
+    cdef Py_ssize_t strides[1]
+
+    def __cinit__(self, state: list[int] | Board | None = None, order: int = 3):
+        cdef vector[int] storage
+        cdef StateView state_impl
+
+        if state is not None:
+            state_impl = state_view(state, storage)
+            order = order_of(state_impl.size())
+            if order == 0:
+                raise ValueError(f"Unsupported number of cells: {state_impl.size()}")
+
+        self.order = order
+        self.board = make_board(self.order)
+        self.shape[0] = self.board.get().size()
+        self.strides[0] = sizeof(uint16_t)
+
+        if state is not None:
+            self.board.get().load(state_impl)
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __getitem__(self, Py_ssize_t index) -> int:
+        if (index < 0) or (index >= self.shape[0]):
+            raise IndexError("Board index out of range")
+
+        return self.board.get().data()[index]
+
+    def __getbuffer__(self, Py_buffer* buffer, int flags):
+        if flags & PyBUF_WRITABLE:
+            raise BufferError("Board is read-only, use set()")
+
+        buffer.buf = <void*>self.board.get().data()
+        buffer.obj = self
+        buffer.len = self.shape[0] * sizeof(uint16_t)
+        buffer.readonly = 1
+        buffer.itemsize = sizeof(uint16_t)
+        buffer.format = b"H"
+        buffer.ndim = 1
+        buffer.shape = self.shape
+        buffer.strides = self.strides
+        buffer.suboffsets = NULL
+        buffer.internal = NULL
+
+    def __releasebuffer__(self, Py_buffer* buffer):
+        pass
+
+    def tolist(self) -> list[int]:
+        return self.board.get().state()
+
+    def copy(self) -> Board:
+        return Board(self)
+
+    # Replaces the mask of a cell, returns the indexes of the cells whose conflict state changed
+    def set(self, Py_ssize_t index, int mask) -> list[int]:
+        if (index < 0) or (index >= self.shape[0]):
+            raise IndexError("Board index out of range")
+
+        if (mask < 0) or (mask > 0xFFFF):
+            raise ValueError(f"Invalid cell mask: {mask}")
+
+        if self.board.get().set(index, mask, self.changed):
+            self.candidates_cache = None
+
+        if self.changed.size() > 0:
+            self.conflicts_cache = None
+
+        return self.changed
+
+    # Mask of the values not held by any peer of the cell (see list_candidates())
+    def candidates(self, Py_ssize_t index) -> int:
+        if (index < 0) or (index >= self.shape[0]):
+            raise IndexError("Board index out of range")
+
+        return self.board.get().candidates(index)
+
+    # Candidates of all cells (see list_all_candidates()), cached until a value changes
+    def all_candidates(self) -> tuple[int, ...]:
+        cdef const uint16_t* data
+        cdef Py_ssize_t index
+
+        if self.candidates_cache is None:
+            data = self.board.get().candidate_data()
+            self.candidates_cache = tuple([data[index] for index in range(self.shape[0])])
+
+        return self.candidates_cache
+
+    def is_conflict(self, Py_ssize_t index) -> bool:
+        if (index < 0) or (index >= self.shape[0]):
+            raise IndexError("Board index out of range")
+
+        return self.board.get().conflicted(index)
+
+    # Indexes of the cells in conflict with another cell (see list_conflicts()), cached until they change
+    def conflicts(self) -> frozenset[int]:
+        cdef int index
+
+        if self.conflicts_cache is None:
+            self.conflicts_cache = frozenset(
+                [index for index in range(self.shape[0]) if self.board.get().conflicted(index)]
+            )
+
+        return self.conflicts_cache
+
+    @property
+    def conflict_count(self) -> int:
+        return self.board.get().conflict_count()
+
+
+# View of the masks of a Board, or of a list converted into `storage` (which has to outlive the view).
+# Boards are read in place, so they must not be changed by another thread while a call reads them
+cdef StateView state_view(state, vector[int]& storage):
+    cdef BoardImpl* board
+
+    if isinstance(state, Board):
+        board = (<Board>state).board.get()
+        return StateView(board.data(), board.size())
+
+    storage = state
+    return StateView(storage)
+
 
+def decode_states(blob: bytes | str, order: int = 3) -> StateArray:
+    if isinstance(blob, str):
+        blob = blob.encode()
 
-def list_conflicts(state: list[int]) -> set[int]:
-    return list_conflicts_impl(state)
+    cdef const unsigned char[::1] data = blob
+    cdef const char* data_ptr = <const char*>&data[0] if data.shape[0] > 0 else NULL
+    cdef size_t size = data.shape[0]
+    cdef int order_impl = order
+    cdef long count
 
+    with nogil:
+        count = decode_states_impl(data_ptr, size, NULL, order_impl)
 
-def list_candidates(state: list[int], index: int) -> int:
-    return list_candidates_impl(state, index)
+    if count < 0:
+        raise ValueError(f"Invalid game state on line {-count}")
+
+    cdef StateArray result = StateArray(count, "H", order ** 4)
+    with nogil:
+        decode_states_impl(data_ptr, size, <uint16_t*>result.data.data(), order_impl)
+
+    return result
+
+
+def encode_states(states) -> bytes:
+    cdef const uint16_t[:, ::1] data = states
+    cdef int order = order_of(data.shape[1])
+    if order == 0:
+        raise ValueError("Expected an array of shape (N, cells) for a supported order")
+
+    cdef size_t count = data.shape[0]
+    cdef size_t cells = data.shape[1]
+    cdef bytes result = PyBytes_FromStringAndSize(NULL, count * (cells + 1))
+    cdef char* result_ptr = PyBytes_AS_STRING(result)
+    cdef bint valid = True
+
+    if count > 0:
+        with nogil:
+            valid = encode_states_impl(&data[0, 0], count, result_ptr, order)
+
+    if not valid:
+        raise ValueError("Invalid cell mask")
+
+    return result
+
+
+def list_conflicts_many(states) -> StateArray:
+    cdef const uint16_t[:, ::1] data = states
+    cdef int order = order_of(data.shape[1])
+    if order == 0:
+        raise ValueError("Expected an array of shape (N, cells) for a supported order")
+
+    cdef size_t count = data.shape[0]
+    cdef StateArray result = StateArray(count, "?", data.shape[1])
+
+    if count > 0:
+        with nogil:
+            mark_conflicts_many(&data[0, 0], count, result.data.data(), order)
+
+    return result
+
+
+# Boards return their cached conflicts (see Board.conflicts()) as they are
+def list_conflicts(state: list[int] | Board) -> set[int] | frozenset[int]:
+    cdef vector[int] storage
+
+    if isinstance(state, Board):
+        return state.conflicts()
+
+    return list_conflicts_impl(state_view(state, storage))
+
+
+# Grades a puzzle by the solving techniques (see `techniques`, from the easiest to the hardest) needed to solve it
+# without guessing. Returns the number of applications of every technique, a rating which grows with the number and
+# difficulty of the techniques used, and whether they were enough to solve the puzzle
+def grade(state: list[int] | Board) -> tuple[dict[str, int], int, bool]:
+    cdef vector[int] storage
+    cdef StateView state_impl = state_view(state, storage)
+    cdef Grade result
+
+    with nogil:
+        result = grade_impl(state_impl)
+
+    return dict(zip(techniques, result.histogram)), result.rating, result.solved
+
+
+def list_candidates(state: list[int] | Board, index: int) -> int:
+    if isinstance(state, Board):
+        return state.candidates(index) if 0 <= index < len(state) else 0
+
+    cdef vector[int] storage
+    return list_candidates_impl(state_view(state, storage), index)
+
+
+def list_all_candidates(state: list[int] | Board) -> list[int]:
+    if isinstance(state, Board):
+        return list(state.all_candidates())
+
+    cdef vector[int] storage
+    return list_all_candidates_impl(state_view(state, storage))
+
+
+# Number of native allocations (calls to operator new) made by the module so far. Only counted when it is built
+# with -DVSEXT_COUNT_ALLOCATIONS, None otherwise
+def native_allocations() -> int | None:
+    cdef long long count = allocation_count()
+    return None if count < 0 else count
 
 
 def bit_length(x: int) -> int:
@@ -57,8 +637,8 @@ def bit_count(x: int) -> int:
     return bit_count_impl(x)
 
 
-def encode_mask(value: int) -> int:
-    return (1 << value) if value >= 0 else MASK_FULL
+def encode_mask(value: int, order: int = 3) -> int:
+    return (1 << value) if value >= 0 else (1 << order ** 2) - 1
 
 
 def decode_mask(mask: int) -> int:
@@ -68,18 +648,27 @@ def decode_mask(mask: int) -> int:
     return bit_length_impl(mask & (-mask)) - 1
 
 
-def encode_state(state: list[int]) -> str:
-    if (len(state) != SIZE_2) or any(x < 0 or x > MASK_FULL for x in state):
+# States are encoded as one character per cell: "1" to "9" followed by "A" to "P" for values, "." for unfilled cells.
+# The order is given by the length of the state
+def encode_state(state: list[int] | Board) -> str:
+    cdef int order = order_of(len(state))
+    if (order == 0) or any(x < 0 or x > (1 << order ** 2) - 1 for x in state):
         return ""
 
-    return "".join(map(lambda x: str(decode_mask(x) + 1), state)).replace("0", ".")
+    return "".join(value_chars[decode_mask(x)] if bit_count_impl(x) == 1 else "." for x in state)
 
 
 def decode_state(state: str) -> list[int] | None:
-    state = state.replace(".", "0")
-
-    if (len(state) != SIZE_2) or not state.isdecimal():
+    cdef int order = order_of(len(state))
+    if order == 0:
         return None
 
-    return list(map(lambda x: encode_mask(int(x) - 1), state))
+    result = []
+    for c in state.upper():
+        value = -1 if c in ".0" else value_chars.find(c, 0, order ** 2)
+        if (value < 0) and (c not in ".0"):
+            return None
+
+        result.append(encode_mask(value, order))
 
+    return result
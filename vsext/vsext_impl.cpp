@@ -1,23 +1,84 @@
+#include <array>
 #include <vector>
 #include <limits>
-#include <unordered_map>
 #include <unordered_set>
 #include <random>
 #include <utility>
+#include <tuple>
 #include <algorithm>
-#include <functional>
+#include <thread>
+#include <atomic>
+#include <exception>
+#include <memory>
+#include <string>
+#include <stdexcept>
+#include <cstdint>
 #include <bit>
+#include <type_traits>
+#include <chrono>
+#include <new>
+#include <cstdlib>
 
-constexpr int ORDER = 3;
-constexpr int SIZE_1 = (ORDER * ORDER);
-constexpr int SIZE_2 = (SIZE_1 * SIZE_1);
+// Supported range of grid orders (a grid of order N has N x N blocks of N x N cells)
+constexpr int ORDER_MIN = 2;
+constexpr int ORDER_MAX = 5;
 
 constexpr int ROW = 0;
 constexpr int COL = 1;
 constexpr int BLK = 2;
 
-constexpr int MASK_FULL = ((1 << SIZE_1) - 1);
-constexpr int SCORE_STEP = SIZE_2;
+// Number of steps without progress after which Solver::generate_targeted() starts over
+constexpr int TARGET_STALL_LIMIT = 64;
+
+// Number of guesses per cell of the grid after which a search for an alternative solution in Solver::generate_once()
+// gives up and keeps the clue. Never reached on 9x9 grids, it keeps larger ones from getting stuck on hard searches
+// while growing with their size (about 1 in 25 searches still gives up on 16x16 grids, half of them on 25x25 grids)
+constexpr int GENERATE_SEARCH_LIMIT = 4;
+
+#ifdef VSEXT_COUNT_ALLOCATIONS
+// Debug builds (compiled with -DVSEXT_COUNT_ALLOCATIONS) replace the global operator new with one which counts
+// every call, so that benchmarks can report native allocations per operation
+std::atomic<long long> allocation_counter{0};
+
+void* operator new(std::size_t size) {
+    allocation_counter.fetch_add(1, std::memory_order_relaxed);
+    if (void* pointer = std::malloc((size > 0) ? size : 1)) {
+        return pointer;
+    }
+
+    throw std::bad_alloc();
+}
+
+void* operator new[](std::size_t size) {
+    return operator new(size);
+}
+
+void operator delete(void* pointer) noexcept {
+    std::free(pointer);
+}
+
+void operator delete(void* pointer, std::size_t) noexcept {
+    std::free(pointer);
+}
+
+void operator delete[](void* pointer) noexcept {
+    std::free(pointer);
+}
+
+void operator delete[](void* pointer, std::size_t) noexcept {
+    std::free(pointer);
+}
+
+// Returns the number of calls to operator new made so far
+inline long long allocation_count() {
+    return allocation_counter.load(std::memory_order_relaxed);
+}
+#else
+// Allocations are only counted in debug builds (see above)
+inline long long allocation_count() {
+    return -1;
+}
+#endif
 
 inline int bit_length(int x) {
     x |= x >> 1;
@@ -41,52 +102,263 @@ inline int mask_decode(int mask) {
     return bit_length(mask & (-mask)) - 1;
 }
 
+// Characters of values in encoded states ('.' or '0' stand for unfilled cells)
+constexpr char VALUE_CHARS[] = "123456789ABCDEFGHIJKLMNOP";
+
+// Returns the value of a character in an encoded state, -1 for unfilled cells and -2 for invalid characters
+inline int value_decode(char c) {
+    if ((c == '.') || (c == '0')) {
+        return -1;
+    }
+    else if ((c >= '1') && (c <= '9')) {
+        return c - '1';
+    }
+    else if ((c >= 'A') && (c <= 'P')) {
+        return c - 'A' + 9;
+    }
+    else if ((c >= 'a') && (c <= 'p')) {
+        return c - 'a' + 9;
+    }
+
+    return -2;
+}
+
 // Returns the index of a cell given as an offset into one of its groups
-inline int group_combine(int group, int index, int offset) {
+constexpr int group_combine(int order, int group, int index, int offset) {
+    int size = order * order;
+
     switch (group) {
         // index = row, offset = col
-        case ROW: return index * SIZE_1 + offset;
+        case ROW: return index * size + offset;
         // index = col, offset = row
-        case COL: return offset * SIZE_1 + index;
+        case COL: return offset * size + index;
         // index = blk_outer, offset = blk_inner (see Grid.update())
         case BLK: return \
-            ((index / ORDER) * ORDER + offset / ORDER) * SIZE_1 + \
-            ((index % ORDER) * ORDER + offset % ORDER);
+            ((index / order) * order + offset / order) * size + \
+            ((index % order) * order + offset % order);
     }
 
     return 0;
 }
 
-class Solver {
-public:
-    // Callback invoked when a solution has been found; returning `true` stops the search
-    using callback_t = std::function<bool(const std::vector<int>& cells, int score)>;
-    using result_t = std::pair<std::vector<int>, int>; // (cells, score)
+// Dimensions of grids of the given order, and lookup tables for the cells of every unit
+// (unit = group * SIZE_1 + group index), the units of every cell, the offsets of every cell inside its units
+// and the peers of every cell
+template <int Order>
+struct Geometry {
+    static constexpr int ORDER = Order;
+    static constexpr int SIZE_1 = ORDER * ORDER;
+    static constexpr int SIZE_2 = SIZE_1 * SIZE_1;
+    static constexpr int MASK_FULL = (1 << SIZE_1) - 1;
+    static constexpr int SCORE_STEP = SIZE_2;
+    static constexpr int UNITS = SIZE_1 * 3; // rows, columns and blocks
+    static constexpr int PEERS = 2 * (SIZE_1 - 1) + (ORDER - 1) * (ORDER - 1); // cells sharing a unit with a cell
+
+    // Sets of units are stored as bitmasks in one or more words
+    using unit_set_t = std::conditional_t<(UNITS <= 32), std::uint32_t, std::uint64_t>;
+    static constexpr int UNIT_SET_BITS = sizeof(unit_set_t) * 8;
+    static constexpr int UNIT_SET_WORDS = (UNITS + UNIT_SET_BITS - 1) / UNIT_SET_BITS;
+    using unit_set = std::array<unit_set_t, UNIT_SET_WORDS>;
+
+    std::array<std::array<int, SIZE_1>, UNITS> unit_cells{};
+    std::array<std::array<int, 3>, SIZE_2> cell_units{};
+    std::array<std::array<int, 3>, SIZE_2> cell_offsets{};
+    std::array<unit_set, SIZE_2> cell_unit_bits{}; // set of the units of every cell
+    std::array<std::array<int, PEERS>, SIZE_2> cell_peers{};
+};
 
-    Solver() {
-        m_indexes.resize(SIZE_2, 0);
-        for (int i = 0; i < SIZE_2; ++i) {
-            m_indexes[i] = i;
+template <int Order>
+constexpr Geometry<Order> make_geometry() {
+    using G = Geometry<Order>;
+    G tables;
+
+    for (int unit = 0; unit < G::UNITS; ++unit) {
+        for (int offset = 0; offset < G::SIZE_1; ++offset) {
+            int index = group_combine(Order, unit / G::SIZE_1, unit % G::SIZE_1, offset);
+            tables.unit_cells[unit][offset] = index;
+            tables.cell_units[index][unit / G::SIZE_1] = unit;
+            tables.cell_offsets[index][unit / G::SIZE_1] = offset;
+            tables.cell_unit_bits[index][unit / G::UNIT_SET_BITS] |=
+                typename G::unit_set_t(1) << (unit % G::UNIT_SET_BITS);
+        }
+    }
+
+    // Peers are collected from the cell's units and listed in ascending order. Visiting only these units (rather
+    // than comparing every pair of cells) keeps constant evaluation within the compiler's limits up to order 5
+    for (int index = 0; index < G::SIZE_2; ++index) {
+        std::array<bool, G::SIZE_2> peer{};
+        for (int unit : tables.cell_units[index]) {
+            for (int other : tables.unit_cells[unit]) {
+                peer[other] = true;
+            }
+        }
+
+        int count = 0;
+        for (int other = 0; other < G::SIZE_2; ++other) {
+            if (peer[other] && (other != index)) {
+                tables.cell_peers[index][count++] = other;
+            }
         }
+    }
+
+    return tables;
+}
+
+// Built at compile time for every supported order
+template <int Order>
+constexpr Geometry<Order> TABLES = make_geometry<Order>();
+
+// Score of a guess on 9x9 grids, the unit of the difficulty levels of the app
+constexpr int SCORE_STEP = Geometry<3>::SCORE_STEP;
+
+// Returns the order of grids with the given number of cells, or 0 if there is none in the supported range
+inline int order_of(size_t size) {
+    switch (size) {
+        case Geometry<2>::SIZE_2: return 2;
+        case Geometry<3>::SIZE_2: return 3;
+        case Geometry<4>::SIZE_2: return 4;
+        case Geometry<5>::SIZE_2: return 5;
+    }
+
+    return 0;
+}
+
+// Calls `function` with std::integral_constant<int, order>, so that it can instantiate templates for the given order
+template <typename F>
+decltype(auto) with_order(int order, F&& function) {
+    switch (order) {
+        case 2: return function(std::integral_constant<int, 2>());
+        case 3: return function(std::integral_constant<int, 3>());
+        case 4: return function(std::integral_constant<int, 4>());
+        case 5: return function(std::integral_constant<int, 5>());
+    }
+
+    throw std::invalid_argument("Unsupported order: " + std::to_string(order));
+}
+
+using result_t = std::pair<std::vector<int>, int>; // (cells, score)
+
+// Read-only view of the cell masks of a state, held either as ints (e.g. converted from a Python list) or as the 16-bit
+// masks of a Board, so that boards are given to the solver and the board functions without being copied
+class StateView {
+public:
+    StateView() = default;
+    StateView(const std::vector<int>& state) : m_ints(state.data()), m_size(state.size()) {}
+    StateView(const std::uint16_t* masks, size_t size) : m_masks(masks), m_size(size) {}
+
+    size_t size() const {
+        return m_size;
+    }
+
+    int operator[](size_t index) const {
+        return (m_ints != nullptr) ? m_ints[index] : m_masks[index];
+    }
+
+private:
+    const int* m_ints = nullptr;
+    const std::uint16_t* m_masks = nullptr;
+    size_t m_size = 0;
+};
+
+template <int Order>
+class GroupGrid {
+public:
+    static constexpr int ORDER = Geometry<Order>::ORDER;
+    static constexpr int SIZE_1 = Geometry<Order>::SIZE_1;
+    static constexpr int SIZE_2 = Geometry<Order>::SIZE_2;
+    static constexpr int MASK_FULL = Geometry<Order>::MASK_FULL;
+
+    // Upper bound on the number of mask changes along any path of the search tree:
+    // each cell and group mask can only lose bits, and has at most SIZE_1 - 1 bits to lose
+    static constexpr int TRAIL_SIZE = SIZE_2 * 4 * (SIZE_1 - 1);
 
+    GroupGrid() {
         m_cells.resize(SIZE_2, MASK_FULL);
         m_groups.resize(SIZE_2 * 3, MASK_FULL);
-        m_rng.seed(std::random_device{}());
+        m_pending.fill(0);
+    }
+
+    int cell(int index) const {
+        return m_cells[index];
+    }
+
+    int mark() const {
+        return m_trail_size;
+    }
+
+    // Returns the number of cell mask changes recorded since mark() (group masks are not counted)
+    int changes(int mark) const {
+        int count = 0;
+        for (int i = mark; i < m_trail_size; ++i) {
+            count += (m_trail[i].first < SIZE_2) ? 1 : 0;
+        }
+
+        return count;
+    }
+
+    // Undoes all mask changes recorded since the trail had the given size (see mark())
+    void rollback(int mark) {
+        while (m_trail_size > mark) {
+            auto [slot, mask] = m_trail[--m_trail_size];
+            if (slot < SIZE_2) {
+                m_cells[slot] = mask;
+            }
+            else {
+                m_groups[slot - SIZE_2] = mask;
+            }
+        }
     }
 
-private:
     // Method implementing constraint propagation.
     // Updates the bitmask of a cell given by its index and fully propagates the effects to other cells.
     // Returns `false` if the grid's state became invalid in the process, `true` otherwise
     bool update(int index, int mask) {
-        std::unordered_map<int, int> updates{{index, mask}};
+        m_pending[index] = mask;
+        m_queue[0] = index;
+        m_queue_size = 1;
+
+        bool result = propagate();
+
+        // Drop whatever is left in the worklist if propagation was cut short by a contradiction
+        while (m_queue_size > 0) {
+            m_pending[m_queue[--m_queue_size]] = 0;
+        }
+
+        return result;
+    }
+
+private:
+    // Mask setters recording the previous value on the trail, so that it can be restored by rollback()
+    void set_cell(int index, int mask) {
+        m_trail[m_trail_size++] = {index, m_cells[index]};
+        m_cells[index] = mask;
+    }
+
+    void set_group(int offset, int mask) {
+        m_trail[m_trail_size++] = {SIZE_2 + offset, m_groups[offset]};
+        m_groups[offset] = mask;
+    }
+
+    // Merges an update into the worklist, enqueueing the target cell if it is not pending yet.
+    // Returns `false` if the target cell would be left with no possible values
+    bool enqueue(int target, int mask) {
+        int& target_mask = m_pending[target];
+        if (target_mask == 0) {
+            target_mask = MASK_FULL;
+            m_queue[m_queue_size++] = target;
+        }
 
+        return (target_mask &= m_cells[target] & mask) != 0;
+    }
+
+    // Processes the worklist until it is empty; see update()
+    bool propagate() {
         // Each update clears some bits of a cell's mask (by way of a bitwise and),
         // which are then used to update group masks and potentially enqueue updates to other cells
-        while (updates.size() > 0) {
-            index = updates.begin()->first;
-            mask = updates.begin()->second;
-            updates.erase(updates.begin());
+        while (m_queue_size > 0) {
+            int index = m_queue[--m_queue_size];
+            int mask = m_pending[index];
+            m_pending[index] = 0;
 
             int mask_old = m_cells[index];
             int mask_new = mask_old & mask;
@@ -99,26 +371,18 @@ private:
                 continue;
             }
             else {
-                m_cells[index] = mask_new;
+                set_cell(index, mask_new);
             }
 
-            int row = index / SIZE_1;
-            int col = index % SIZE_1;
-            int blk_outer = (row / ORDER) * ORDER + (col / ORDER) % ORDER; // index of this cell's block
-            int blk_inner = (row % ORDER) * ORDER + col % ORDER; // index of this cell inside its block
-
-            // Indexes of the groups that this cell belongs to
-            int group_indexes[] = {row, col, blk_outer};
+            // Units that this cell belongs to (one per group)
+            const auto& units = TABLES<Order>.cell_units[index];
+            const auto& offsets = TABLES<Order>.cell_offsets[index];
 
             // Offsets to the beginning of each of this cell's groups in m_groups
-            int group_bases[] = {
-                ROW * SIZE_2 + row * SIZE_1,
-                COL * SIZE_2 + col * SIZE_1,
-                BLK * SIZE_2 + blk_outer * SIZE_1,
-            };
+            int group_bases[] = {units[ROW] * SIZE_1, units[COL] * SIZE_1, units[BLK] * SIZE_1};
 
             // Masked positions of this cell inside its groups
-            int group_bits[] = {mask_encode(col), mask_encode(row), mask_encode(blk_inner)};
+            int group_bits[] = {mask_encode(offsets[ROW]), mask_encode(offsets[COL]), mask_encode(offsets[BLK])};
 
             // Iterate over the just-cleared bits
             for (int delta_value = 0; delta_value < SIZE_1; ++delta_value) {
@@ -137,25 +401,18 @@ private:
                         return false;
                     }
                     else {
-                        m_groups[group_base + delta_value] = group_mask;
+                        set_group(group_base + delta_value, group_mask);
                     }
 
                     // If delta_value has only one viable position, place it there via an update
                     if (bit_count(group_mask) == 1) {
                         // Find the index of the target cell
-                        int target = group_combine(group, group_indexes[group], mask_decode(group_mask));
-                        int target_mask = updates[target];
-                        if (target_mask == 0) {
-                            target_mask = MASK_FULL;
-                        }
+                        int target = TABLES<Order>.unit_cells[units[group]][mask_decode(group_mask)];
 
                         // Fail if delta_value cannot be placed in the target cell
-                        if ((target_mask &= m_cells[target] & delta_bit) == 0) {
+                        if (!enqueue(target, delta_bit)) {
                             return false;
                         }
-                        else {
-                            updates[target] = target_mask;
-                        }
                     }
                 }
             }
@@ -173,7 +430,7 @@ private:
                 // Group masks for the value are used to locate cells that need to be updated
                 // (this is more efficient than iterating through all potentially affected cells)
                 for (int group = 0; group < 3; ++group) {
-                    int group_index = group_indexes[group];
+                    const auto& unit_cells = TABLES<Order>.unit_cells[units[group]];
                     int group_mask = group_masks[group];
                     int group_bit = group_bits[group]; // bit to be skipped (corresponding to the updated cell)
 
@@ -185,19 +442,12 @@ private:
                         }
 
                         // Find the index of the cell from which to remove our value
-                        int target = group_combine(group, group_index, offset);
-                        int target_mask = updates[target];
-                        if (target_mask == 0) {
-                            target_mask = MASK_FULL;
-                        }
+                        int target = unit_cells[offset];
 
                         // Fail if the target cell has no other possible values left
-                        if ((target_mask &= m_cells[target] & ~mask_new) == 0) {
+                        if (!enqueue(target, ~mask_new)) {
                             return false;
                         }
-                        else {
-                            updates[target] = target_mask;
-                        }
                     }
                 }
             }
@@ -206,89 +456,320 @@ private:
         return true;
     }
 
-    // Method implementing recursive tree search.
-    // Calls the `callback` when a solution is found, stopping the search if it returns `true`;
-    // the method's return value indicates whether this occurred or not
-    bool solve_step(bool randomize, const callback_t& callback, int score) {
-        int best_index = 0;
-        int best_mask = 0;
-        int best_count = -1;
+    std::vector<int> m_cells; // bitmasks of possible values for every cell
+    std::vector<int> m_groups; // bitmasks of possible positions for each value in each group
+    std::array<int, SIZE_2> m_pending; // masks of pending updates for every cell (0 if not enqueued)
+    std::array<int, SIZE_2> m_queue; // stack of indexes of cells with pending updates
+    int m_queue_size = 0;
+    std::array<std::pair<int, int>, TRAIL_SIZE> m_trail; // (slot, old mask) for every mask change, see set_cell()
+    int m_trail_size = 0;
+};
 
-        // From yet unfilled cells choose the one with the lowest number of possible values
-        // In this implementation there seems to always be exactly one cell with exactly two possible values
-        // (provided that the initial state was uniquely solvable and all bitmasks were properly update()ed),
-        // which means that checking bitcounts in m_groups the same way as in m_cells would be redundant
-        for (int i = 0; i < SIZE_2; ++i) {
-            int index = randomize ? m_indexes[i] : i;
-            int mask = m_cells[index];
-            int count = bit_count(mask);
+// Propagation engine storing only the cell masks, as 16-bit values in a fixed array (32-bit for order 5).
+// Singles are eliminated from their precomputed peers, and hidden singles are found by scanning whole units
+// with branch-free bitwise folds (values seen at least once / at least twice), skipping units that have not changed
+template <int Order>
+class BitboardGrid {
+public:
+    static constexpr int ORDER = Geometry<Order>::ORDER;
+    static constexpr int SIZE_1 = Geometry<Order>::SIZE_1;
+    static constexpr int SIZE_2 = Geometry<Order>::SIZE_2;
+    static constexpr int MASK_FULL = Geometry<Order>::MASK_FULL;
 
-            // Zero masks are caught by update(), no need to check for them
-            if (count == 1) {
-                continue;
-            }
+    using mask_t = std::conditional_t<(SIZE_1 <= 16), std::uint16_t, std::uint32_t>;
 
-            if ((count < best_count) || (best_count < 0)) {
-                best_index = index;
-                best_mask = mask;
-                best_count = count;
+    // Every cell mask can lose at most SIZE_1 - 1 bits along any path of the search tree
+    static constexpr int TRAIL_SIZE = SIZE_2 * (SIZE_1 - 1);
 
-                // 2 is the smallest possible bitcount here
-                if (count == 2) {
-                    break;
-                }
+    BitboardGrid() {
+        m_cells.fill(MASK_FULL);
+    }
+
+    int cell(int index) const {
+        return m_cells[index];
+    }
+
+    int mark() const {
+        return m_trail_size;
+    }
+
+    // Returns the number of cell mask changes recorded since mark()
+    int changes(int mark) const {
+        return m_trail_size - mark;
+    }
+
+    // Undoes all mask changes recorded since the trail had the given size (see mark())
+    void rollback(int mark) {
+        while (m_trail_size > mark) {
+            auto [index, mask] = m_trail[--m_trail_size];
+            m_cells[index] = mask;
+        }
+    }
+
+    // Narrows down the bitmask of a cell and fully propagates the effects to other cells.
+    // Returns `false` if the grid's state became invalid in the process, `true` otherwise
+    bool update(int index, int mask) {
+        bool result = assign(index, m_cells[index] & mask) && propagate();
+
+        // Drop whatever is left to do if propagation was cut short by a contradiction
+        m_singles_size = 0;
+        m_dirty = {};
+
+        return result;
+    }
+
+private:
+    static constexpr int UNIT_SET_BITS = Geometry<Order>::UNIT_SET_BITS;
+    static constexpr int UNIT_SET_WORDS = Geometry<Order>::UNIT_SET_WORDS;
+
+    // Replaces the mask of a cell, recording the change on the trail and scheduling its consequences
+    bool assign(int index, mask_t mask) {
+        mask_t mask_old = m_cells[index];
+        if (mask == mask_old) {
+            return true;
+        }
+        else if (mask == 0) {
+            return false;
+        }
+
+        m_trail[m_trail_size++] = {index, mask_old};
+        m_cells[index] = mask;
+        add_dirty(index);
+
+        if (bit_count(mask) == 1) {
+            m_singles[m_singles_size++] = index;
+        }
+
+        return true;
+    }
+
+    // Marks the units of a cell as changed
+    void add_dirty(int index) {
+        const auto& bits = TABLES<Order>.cell_unit_bits[index];
+
+        if constexpr (UNIT_SET_WORDS == 1) {
+            m_dirty[0] |= bits[0];
+        }
+        else {
+            for (int word = 0; word < UNIT_SET_WORDS; ++word) {
+                m_dirty[word] |= bits[word];
             }
         }
+    }
+
+    // Removes the first changed unit from the set and returns it, or -1 if there is none
+    int pop_dirty() {
+        if constexpr (UNIT_SET_WORDS == 1) {
+            if (m_dirty[0] == 0) {
+                return -1;
+            }
 
-        if (best_count < 0) {
-            // All cells are filled, we are done
-            return callback(m_cells, score); 
+            int unit = std::countr_zero(m_dirty[0]);
+            m_dirty[0] &= m_dirty[0] - 1;
+            return unit;
         }
-        else if (best_count > 1) {
-            std::vector<int> bits;
 
-            // Extract individual set bits from best_mask
-            for (int value = 0; value < SIZE_1; ++value) {
-                int bit = mask_encode(value);
-                if ((bit & best_mask) != 0) {
-                    bits.push_back(bit);
+        for (int word = 0; word < UNIT_SET_WORDS; ++word) {
+            auto& bits = m_dirty[word];
+            if (bits != 0) {
+                int unit = word * UNIT_SET_BITS + std::countr_zero(bits);
+                bits &= bits - 1;
+                return unit;
+            }
+        }
+
+        return -1;
+    }
+
+    bool propagate() {
+        while (true) {
+            // Remove the values of solved cells from all of their peers
+            while (m_singles_size > 0) {
+                int index = m_singles[--m_singles_size];
+                mask_t mask = m_cells[index];
+
+                for (int peer : TABLES<Order>.cell_peers[index]) {
+                    mask_t peer_mask = m_cells[peer];
+                    if (((peer_mask & mask) != 0) && !assign(peer, peer_mask & ~mask)) {
+                        return false;
+                    }
                 }
             }
 
-            if (randomize) {
-                std::shuffle(bits.begin(), bits.end(), m_rng);
+            int unit = pop_dirty();
+            if (unit < 0) {
+                return true;
             }
 
-            m_guesses.push_back(best_index);
+            const auto& unit_cells = TABLES<Order>.unit_cells[unit];
+            mask_t once = 0;
+            mask_t twice = 0;
 
-            // Try to place every extracted bit/value in the chosen cell
-            for (int bit : bits) {
-                std::vector<int> backup_cells = m_cells;
-                std::vector<int> backup_groups = m_groups;
+            for (int index : unit_cells) {
+                mask_t mask = m_cells[index];
+                twice |= once & mask;
+                once |= mask;
+            }
 
-                if (update(best_index, bit)) {
-                    if (solve_step(randomize, callback, score + SCORE_STEP)) {
-                        return true; // NOTE: m_guesses is intentionally not restored
-                    }
+            // Fail if some value has no viable positions left inside this unit
+            if (once != MASK_FULL) {
+                return false;
+            }
+
+            // Values with exactly one viable position have to be placed there
+            mask_t unique = once & ~twice;
+            if (unique == 0) {
+                continue;
+            }
+
+            for (int index : unit_cells) {
+                mask_t mask = m_cells[index] & unique;
+                if (mask == 0) {
+                    continue;
                 }
 
-                m_cells = std::move(backup_cells);
-                m_groups = std::move(backup_groups);
+                // Fail if more than one value has to be placed in the same cell
+                if ((bit_count(mask) > 1) || !assign(index, mask)) {
+                    return false;
+                }
             }
+        }
+    }
+
+    std::array<mask_t, SIZE_2> m_cells; // bitmasks of possible values for every cell
+    std::array<int, SIZE_2> m_singles; // stack of indexes of cells which became solved and were not propagated yet
+    int m_singles_size = 0;
+    typename Geometry<Order>::unit_set m_dirty{}; // set of units which changed since they were last scanned
+    std::array<std::pair<int, mask_t>, TRAIL_SIZE> m_trail; // (index, old mask) for every mask change
+    int m_trail_size = 0;
+};
+
+// Returns a seed drawn from the system's entropy source
+inline std::uint64_t random_seed() {
+    std::random_device device;
+    return ((std::uint64_t)device() << 32) | device();
+}
+
+// Seeds a generator from (seed, stream). Every pair yields its own sequence, which is how parallel workers
+// get independent streams from one seed
+inline void seed_rng(std::mt19937& rng, std::uint64_t seed, std::uint64_t stream) {
+    std::seed_seq sequence{
+        (std::uint32_t)seed, (std::uint32_t)(seed >> 32), (std::uint32_t)stream, (std::uint32_t)(stream >> 32)
+    };
+    rng.seed(sequence);
+}
 
-            m_guesses.pop_back();
+// Phases of solving and generation timed by SearchStats. Phases may nest: generate_once() runs searches, and scoring
+// starts with a setup of its own
+enum Phase {
+    PHASE_SETUP, // propagation of the initial state (begin())
+    PHASE_SEARCH, // tree search (next())
+    PHASE_SCORE, // scoring of a generated puzzle along its solution path
+    PHASE_GENERATE, // generate_once() as a whole
+    PHASES
+};
+
+constexpr std::array<const char*, PHASES> PHASE_NAMES = {"setup", "search", "score", "generate"};
+
+// Counters collected by a solver while it is given a SearchStats (see SolverBase::set_stats()); they add up over calls
+struct SearchStats {
+    long long nodes = 0; // nodes of the search tree, i.e. cells (DLX: columns) chosen for guessing
+    long long guesses = 0; // values tried at nodes with more than one value to try
+    long long backtracks = 0; // nodes left after trying all of their values
+    long long propagations = 0; // cell mask changes (DLX: columns covered), their number depends on the engine
+    long long contradictions = 0; // updates (DLX: columns without rows) which left no possible values
+    long long solutions = 0; // solutions found
+    int max_depth = 0; // largest number of nested nodes
+    std::vector<double> seconds = std::vector<double>(PHASES); // wall time spent in every phase
+    std::vector<int> path; // indexes of the guessed cells on the way to the last solution found
+};
+
+// Adds the wall time of its own lifetime to `seconds`, unless it is null, in which case it does nothing
+class PhaseTimer {
+public:
+    explicit PhaseTimer(double* seconds) : m_seconds(seconds) {
+        if (m_seconds != nullptr) {
+            m_start = std::chrono::steady_clock::now();
         }
+    }
 
-        return false;
+    ~PhaseTimer() {
+        if (m_seconds != nullptr) {
+            *m_seconds += std::chrono::duration<double>(std::chrono::steady_clock::now() - m_start).count();
+        }
     }
 
+private:
+    double* m_seconds;
+    std::chrono::steady_clock::time_point m_start;
+};
+
+// Interface of solvers independent of their propagation engine
+class SolverBase {
+public:
+    virtual ~SolverBase() = default;
+
+    virtual std::vector<result_t> solve(const StateView& initial, bool randomize, int limit) = 0;
+    virtual int count_solutions(const StateView& initial, int cap) = 0;
+    virtual result_t generate_once() = 0;
+    virtual result_t generate(int score_min, int score_max, int limit) = 0;
+    virtual result_t generate_targeted(int score_min, int score_max, int limit) = 0;
+    virtual void reseed(std::uint64_t seed, std::uint64_t stream) = 0;
+    virtual void set_stats(SearchStats* stats) = 0;
+
+    virtual bool begin(const StateView& initial, bool randomize) = 0;
+    virtual bool next() = 0;
+    virtual void end() = 0;
+    virtual result_t solution() const = 0;
+};
+
+// Tree search and puzzle generation on top of a propagation engine (Grid), which provides:
+// - int cell(int index): current bitmask of a cell
+// - bool update(int index, int mask): narrows a cell down and propagates the effects, `false` on contradiction
+// - int mark(), void rollback(int mark): undoes every update made since mark() was called
+// - int changes(int mark): number of cell mask changes since mark() was called
+// All engines are required to reach the same state after each update, so that results do not depend on the engine
+template <typename Grid>
+class Solver : public SolverBase {
 public:
-    bool solve(const std::vector<int>& initial, bool randomize, const callback_t& callback) {
+    static constexpr int ORDER = Grid::ORDER;
+    static constexpr int SIZE_1 = Grid::SIZE_1;
+    static constexpr int SIZE_2 = Grid::SIZE_2;
+    static constexpr int MASK_FULL = Grid::MASK_FULL;
+    static constexpr int SCORE_STEP = Geometry<ORDER>::SCORE_STEP;
+
+    Solver() {
+        m_guesses.reserve(SIZE_2);
+        reseed(random_seed(), 0);
+    }
+
+    // Restarts the random sequence used for randomized searches and generation. The cell order is shuffled in place,
+    // so it is reset as well for the results to depend on the seed alone
+    void reseed(std::uint64_t seed, std::uint64_t stream) override {
+        m_indexes.resize(SIZE_2, 0);
+        for (int i = 0; i < SIZE_2; ++i) {
+            m_indexes[i] = i;
+        }
+
+        seed_rng(m_rng, seed, stream);
+    }
+
+    // Starts (or with null, stops) collecting counters into `stats`, which must outlive its use by the solver
+    void set_stats(SearchStats* stats) override {
+        m_stats = stats;
+    }
+
+    // Incremental search: begin() sets up the search, next() advances it to the following solution
+    // (see solution()) and returns `false` once there are no solutions left, end() restores the initial state.
+    // The search keeps no state besides a fixed-size stack, so it can be suspended between solutions indefinitely
+    bool begin(const StateView& initial, bool randomize) override {
+        end();
+
         if (initial.size() != SIZE_2) {
             return false;
         }
 
-        bool result = true;
+        PhaseTimer timer(phase_seconds(PHASE_SETUP));
         int score = 0;
 
         // Find all non-full cell masks and update() on them
@@ -296,92 +777,238 @@ public:
             int mask = initial[index];
 
             // Initially, score = number of unfilled cells
-            // Later it is incremented by SCORE_STEP on every recursive solve_step() call
+            // Later it is incremented by SCORE_STEP on every guess
             if (bit_count(mask) > 1) {
                 score += 1;
             }
 
             if (mask != MASK_FULL) {
-                if (!(result = update(index, mask))) {
-                    break;
+                if (!m_grid.update(index, mask)) {
+                    if (m_stats != nullptr) [[unlikely]] {
+                        m_stats->propagations += m_grid.changes(m_base);
+                        m_stats->contradictions += 1;
+                    }
+
+                    m_grid.rollback(0);
+                    return false;
                 }
             }
         }
 
-        if (result) {
-            m_guesses.clear();
-
-            if (randomize) {
-                std::shuffle(m_indexes.begin(), m_indexes.end(), m_rng);
-            }
-
-            result = solve_step(randomize, callback, score);
+        if (m_stats != nullptr) [[unlikely]] {
+            m_stats->propagations += m_grid.changes(m_base);
         }
 
-        // Restore the bitmasks
-        std::fill(m_cells.begin(), m_cells.end(), MASK_FULL);
-        std::fill(m_groups.begin(), m_groups.end(), MASK_FULL);
-
-        return result;
+        start(randomize, score);
+        return true;
     }
 
-    std::vector<result_t> solve(const std::vector<int>& initial, bool randomize, int limit) {
-        std::vector<result_t> results;
+    // Method implementing tree search with an explicit stack of frames (one per guessed cell).
+    // Solutions are found in the same order as by a recursive depth-first search
+    bool next() override {
+        if (!m_active) {
+            return false;
+        }
 
-        if (limit > 0) {
-            auto callback = [&](const std::vector<int>& cells, int score) -> bool {
-                results.push_back({cells, score});
-                return results.size() >= (size_t)limit;
-            };
+        PhaseTimer timer(phase_seconds(PHASE_SEARCH));
 
-            solve(initial, randomize, callback);
-        }
+        while (true) {
+            if (m_descend) {
+                m_descend = false;
 
-        return results;
-    }
+                int best_mask = 0;
+                int best_index = choose(best_mask);
 
-    result_t generate_once() {
-        // Solve an empty grid with randomization
-        auto [solution, score] = solve(m_cells, true, 1)[0];
-        std::vector<int> guesses = m_guesses;
-        std::vector<int> result = m_cells;
+                if (best_index < 0) {
+                    // All cells are filled, a solution has been found (the grid is left in this state until next())
+                    if (m_stats != nullptr) [[unlikely]] {
+                        m_stats->solutions += 1;
+                        m_stats->path = m_guesses;
+                    }
 
-        // Fill in all the guessed values in the resulting state
-        // This way it is guaranteed to have a unique solution
-        for (int index : guesses) {
-            result[index] = solution[index];
-        }
+                    return true;
+                }
 
-        // Randomize further
-        std::shuffle(guesses.begin(), guesses.end(), m_rng);
+                if ((++m_nodes > m_node_limit) && (m_node_limit > 0)) {
+                    m_aborted = true;
+                    end();
+                    return false;
+                }
 
-        // Set up a callback for solve() that counts (up to two) solutions and saves their scores
-        int score_tmp = score;
-        int counter = 0;
-        auto callback = [&](const std::vector<int>&, int s) -> bool {
-            score_tmp = s;
-            return (++counter) > 1;
-        };
+                if (m_stats != nullptr) [[unlikely]] {
+                    m_stats->nodes += 1;
+                    m_stats->max_depth = std::max(m_stats->max_depth, m_depth + 1);
+                }
 
-        // Try to remove the guessed values one by one while preserving the uniqueness of our solution
-        for (int index : guesses) {
-            result[index] = MASK_FULL;
-            counter = 0;
+                Frame& frame = m_frames[m_depth++];
+                frame.index = best_index;
+                frame.count = 0;
+                frame.next = 0;
+                frame.mark = m_grid.mark();
+                frame.score = m_score;
+
+                // Extract individual set bits from best_mask
+                for (int value = 0; value < SIZE_1; ++value) {
+                    int bit = mask_encode(value);
+                    if ((bit & best_mask) != 0) {
+                        frame.bits[frame.count++] = bit;
+                    }
+                }
 
-            // Put the value back if our solution ceases to be unique
-            if (solve(result, false, callback)) {
-                result[index] = solution[index];
+                if (m_randomize) {
+                    std::shuffle(frame.bits, frame.bits + frame.count, m_rng);
+                }
+
+                m_guesses.push_back(best_index);
             }
-            else {
-                score = score_tmp;
+
+            if (m_depth == 0) {
+                // The whole tree has been searched
+                end();
+                return false;
             }
-        }
 
-        // The resulting state is minimal
-        return {result, score};
-    }
+            // Try to place the next extracted bit/value in the cell of the innermost frame
+            Frame& frame = m_frames[m_depth - 1];
+            m_grid.rollback(frame.mark);
 
-    result_t generate(int score_min, int score_max, int limit) {
+            if (frame.next == frame.count) {
+                if (m_stats != nullptr) [[unlikely]] {
+                    m_stats->backtracks += 1;
+                }
+
+                --m_depth;
+                m_guesses.pop_back();
+                continue;
+            }
+
+            bool valid = m_grid.update(frame.index, frame.bits[frame.next++]);
+            if (valid) {
+                m_score = frame.score + SCORE_STEP;
+                m_descend = true;
+            }
+
+            if (m_stats != nullptr) [[unlikely]] {
+                m_stats->guesses += 1;
+                m_stats->propagations += m_grid.changes(frame.mark);
+                m_stats->contradictions += valid ? 0 : 1;
+            }
+        }
+    }
+
+    void end() override {
+        // Restore the bitmasks
+        m_grid.rollback(m_base);
+        m_depth = 0;
+        m_active = false;
+    }
+
+    // Returns the solution just found by next()
+    result_t solution() const override {
+        std::vector<int> cells(SIZE_2);
+        for (int index = 0; index < SIZE_2; ++index) {
+            cells[index] = m_grid.cell(index);
+        }
+
+        return {cells, m_score};
+    }
+
+    // Returns up to `limit` solutions; if the limit is reached, m_guesses holds the path to the last one
+    std::vector<result_t> solve(const StateView& initial, bool randomize, int limit) override {
+        std::vector<result_t> results;
+
+        if ((limit > 0) && begin(initial, randomize)) {
+            while (next()) {
+                results.push_back(solution());
+                if (results.size() >= (size_t)limit) {
+                    break;
+                }
+            }
+        }
+
+        end();
+        return results;
+    }
+
+    // Counts solutions up to `cap` without materializing them; `score` receives the score of the last one found
+    int count_solutions(const StateView& initial, int cap, int& score) {
+        int count = 0;
+
+        if ((cap > 0) && begin(initial, false)) {
+            while (next()) {
+                score = m_score;
+                if (++count >= cap) {
+                    break;
+                }
+            }
+        }
+
+        end();
+        return count;
+    }
+
+    int count_solutions(const StateView& initial, int cap) override {
+        int score = 0;
+        return count_solutions(initial, cap, score);
+    }
+
+    result_t generate_once() override {
+        PhaseTimer timer(phase_seconds(PHASE_GENERATE));
+
+        // Solve an empty grid with randomization
+        std::vector<int> result(SIZE_2, MASK_FULL);
+        auto [solution, score] = solve(result, true, 1)[0];
+        std::vector<int> guesses = m_guesses;
+
+        // Fill in all the guessed values in the resulting state
+        // This way it is guaranteed to have a unique solution
+        for (int index : guesses) {
+            result[index] = solution[index];
+        }
+
+        // Randomize further
+        std::shuffle(guesses.begin(), guesses.end(), m_rng);
+
+        // Try to remove the guessed values one by one while preserving the uniqueness of our solution.
+        // The state before a removal has exactly one solution, so the state after it has another one
+        // if and only if the removed cell can take a different value: only these alternatives have to be searched.
+        // Values which have been put back stay in the grid for good, so they are propagated only once
+        bool removed = false;
+        for (size_t i = 0; i < guesses.size(); ++i) {
+            int index = guesses[i];
+            int mark = m_grid.mark();
+
+            // Values yet to be tried are still part of the state
+            bool valid = m_grid.update(index, MASK_FULL & ~solution[index]);
+            for (size_t j = i + 1; valid && (j < guesses.size()); ++j) {
+                valid = m_grid.update(guesses[j], solution[guesses[j]]);
+            }
+
+            bool unique = !valid || !search_from(mark, GENERATE_SEARCH_LIMIT * SIZE_2);
+            m_grid.rollback(mark);
+
+            // Put the value back if our solution ceases to be unique
+            if (unique) {
+                result[index] = MASK_FULL;
+                removed = true;
+            }
+            else {
+                m_grid.update(index, solution[index]);
+            }
+        }
+
+        m_grid.rollback(0);
+
+        // The score of the resulting state is that of its only solution
+        if (removed) {
+            score = score_path(result, solution);
+        }
+
+        // The resulting state is minimal, unless a search gave up: clues whose removal could not be decided are kept
+        return {result, score};
+    }
+
+    result_t generate(int score_min, int score_max, int limit) override {
         if (score_min < 0) {
             score_min = 0;
         }
@@ -416,71 +1043,1456 @@ public:
         return {best_result, best_score};
     }
 
+    // Steers a puzzle into the given score range by local search. Starting from generate_once(), every step
+    // removes a random clue and, unless the solution stays unique without it, replaces it with a clue which rules out
+    // an alternative solution; the step is kept if the solution is still unique and the score did not move away
+    // from the range. The search restarts from a new puzzle after TARGET_STALL_LIMIT steps without progress.
+    // `limit` is the maximum number of steps (restarts included)
+    result_t generate_targeted(int score_min, int score_max, int limit) override {
+        if (score_min < 0) {
+            score_min = 0;
+        }
+
+        if (score_max < 0) {
+            score_max = std::numeric_limits<int>::max();
+        }
+
+        auto distance = [&](int score) {
+            return (score < score_min) ? (score_min - score) : (score > score_max) ? (score - score_max) : 0;
+        };
+
+        // Puzzles already in the range are returned as they are, without being solved
+        auto [puzzle, score] = generate_once();
+        if (distance(score) == 0) {
+            return {puzzle, score};
+        }
+
+        std::vector<int> solution = solve(puzzle, false, 1)[0].first;
+        std::vector<int> best_result = puzzle;
+        int best_score = score;
+        int stall = 0;
+
+        std::vector<int> cells;
+        cells.reserve(SIZE_2);
+
+        for (int step = 0; (step < limit) && (distance(best_score) > 0); ++step) {
+            if (stall >= TARGET_STALL_LIMIT) {
+                std::tie(puzzle, score) = generate_once();
+                if (distance(score) > 0) {
+                    solution = solve(puzzle, false, 1)[0].first;
+                }
+
+                stall = 0;
+            }
+            else {
+                cells.clear();
+                for (int index = 0; index < SIZE_2; ++index) {
+                    if (puzzle[index] != MASK_FULL) {
+                        cells.push_back(index);
+                    }
+                }
+
+                int clue = cells[std::uniform_int_distribution<size_t>(0, cells.size() - 1)(m_rng)];
+                int blank = -1;
+
+                // Without the clue, alternative solutions have a different value in its cell (see generate_once())
+                puzzle[clue] = MASK_FULL & ~solution[clue];
+
+                if (find_difference(puzzle, solution, cells)) {
+                    // Rule out the alternative found by putting one of the cells where it differs into the puzzle
+                    blank = cells[std::uniform_int_distribution<size_t>(0, cells.size() - 1)(m_rng)];
+                    puzzle[blank] = solution[blank];
+                }
+
+                int score_new = score;
+                bool accepted = false;
+
+                if ((blank < 0) || (count_solutions(puzzle, 1) == 0)) {
+                    puzzle[clue] = MASK_FULL;
+                    score_new = score_path(puzzle, solution);
+                    accepted = distance(score_new) <= distance(score);
+                }
+
+                if (!accepted) {
+                    puzzle[clue] = solution[clue];
+                    if (blank >= 0) {
+                        puzzle[blank] = MASK_FULL;
+                    }
+
+                    ++stall;
+                    continue;
+                }
+
+                stall = (distance(score_new) < distance(score)) ? 0 : stall + 1;
+                score = score_new;
+            }
+
+            if (distance(score) < distance(best_score)) {
+                best_result = puzzle;
+                best_score = score;
+            }
+        }
+
+        return {best_result, best_score};
+    }
+
+    // Returns the score which a search without randomization gives to a solution of `initial`, without searching:
+    // the search reaches the solution by choosing the same cells as on the way there and guessing their solution
+    // values, whatever its other guesses lead to
+    int score_path(const std::vector<int>& initial, const std::vector<int>& solution) {
+        PhaseTimer timer(phase_seconds(PHASE_SCORE));
+        int score = 0;
+
+        if (begin(initial, false)) {
+            int mask = 0;
+            for (int index = choose(mask); index >= 0; index = choose(mask)) {
+                m_grid.update(index, solution[index]);
+                m_score += SCORE_STEP;
+            }
+
+            score = m_score;
+        }
+
+        end();
+        return score;
+    }
+
 private:
-    std::vector<int> m_cells; // bitmasks of possible values for every cell
-    std::vector<int> m_groups; // bitmasks of possible positions for each value in each group
-    std::vector<int> m_guesses; // stack of indexes of cells whose values were guessed in solve_step()
+    struct Frame {
+        int index; // index of the guessed cell
+        int bits[SIZE_1]; // values to be tried in this cell
+        int count; // number of values
+        int next; // index of the next value to try
+        int mark; // grid state from before the guess
+        int score; // score from before the guess
+    };
+
+    // Starts the search from the current state of the grid
+    void start(bool randomize, int score) {
+        m_guesses.clear();
+
+        if (randomize) {
+            std::shuffle(m_indexes.begin(), m_indexes.end(), m_rng);
+        }
+
+        m_randomize = randomize;
+        m_score = score;
+        m_nodes = 0;
+        m_aborted = false;
+        m_descend = true;
+        m_active = true;
+    }
+
+    // Finds a solution of `state` and stores the indexes of the unfilled cells in which it differs from `solution`.
+    // Returns `false` if there is no solution
+    bool find_difference(const std::vector<int>& state, const std::vector<int>& solution, std::vector<int>& cells) {
+        bool result = begin(state, false) && next();
+        cells.clear();
+
+        if (result) {
+            for (int index = 0; index < SIZE_2; ++index) {
+                if ((state[index] == MASK_FULL) && (m_grid.cell(index) != solution[index])) {
+                    cells.push_back(index);
+                }
+            }
+        }
+
+        end();
+        return result;
+    }
+
+    // From yet unfilled cells chooses the one with the lowest number of possible values, returns its index
+    // (and its mask in `best_mask`), or -1 if all cells are filled.
+    // In this implementation there seems to always be exactly one cell with exactly two possible values
+    // (provided that the initial state was uniquely solvable and all bitmasks were properly update()ed),
+    // which means that checking bitcounts in group masks the same way as in cell masks would be redundant
+    int choose(int& best_mask) const {
+        int best_index = -1;
+        int best_count = -1;
+
+        for (int i = 0; i < SIZE_2; ++i) {
+            int index = m_randomize ? m_indexes[i] : i;
+            int mask = m_grid.cell(index);
+            int count = bit_count(mask);
+
+            // Zero masks are caught by update(), no need to check for them
+            if (count == 1) {
+                continue;
+            }
+
+            if ((count < best_count) || (best_count < 0)) {
+                best_index = index;
+                best_mask = mask;
+                best_count = count;
+
+                // 2 is the smallest possible bitcount here
+                if (count == 2) {
+                    break;
+                }
+            }
+        }
+
+        return best_index;
+    }
+
+    // Returns where the time of the given phase is accumulated, or null if stats are not collected
+    double* phase_seconds(Phase phase) const {
+        return (m_stats != nullptr) ? &m_stats->seconds[phase] : nullptr;
+    }
+
+    // Returns whether the current state of the grid has a solution (or the search gave up after `node_limit`
+    // guesses), restoring the state as of `mark` afterwards
+    bool search_from(int mark, int node_limit) {
+        m_base = mark;
+        m_node_limit = node_limit;
+        start(false, 0);
+        bool result = next() || m_aborted;
+        end();
+        m_base = 0;
+        m_node_limit = 0;
+        return result;
+    }
+
+    Grid m_grid;
+    int m_base = 0; // grid state restored by end()
+    std::array<Frame, SIZE_2> m_frames;
+    int m_depth = 0;
+    int m_score = 0;
+    bool m_randomize = false;
+    bool m_descend = false; // whether the search has just entered a new node of the tree
+    bool m_active = false;
+    int m_nodes = 0; // number of guesses since the search started
+    int m_node_limit = 0; // number of guesses after which the search gives up (if positive)
+    bool m_aborted = false; // whether the search gave up
+    SearchStats* m_stats = nullptr; // counters to update, if any
+    std::vector<int> m_guesses; // stack of indexes of cells whose values were guessed on the way to the current node
     std::vector<int> m_indexes; // list of indexes for randomizing cell iteration order
     std::mt19937 m_rng;
 };
 
-// Returns the indexes of all cells which are in conflict with any other cell
-std::unordered_set<int> list_conflicts(const std::vector<int>& state) {
-    std::unordered_set<int> result;
-    std::vector<int> groups; // stores the index of each value in every group (or -1 by default)
+// Tree search by Algorithm X on the exact cover formulation of the puzzle, using dancing links.
+// Every (cell, value) pair allowed by the initial state is a row covering four columns: the cell itself and the value
+// in each of its units. All nodes live in a fixed pool which is relinked by begin(), so no memory is allocated
+// while searching. The search takes other paths than the propagation engines do, so every solution is scored
+// by the bitboard engine along the path that it would take to the solution (see Solver::score_path()): scores are
+// the same as those of the propagation engines for searches without randomization. Puzzles are generated by the
+// bitboard engine as well
+template <int Order>
+class DlxSolver : public SolverBase {
+public:
+    static constexpr int ORDER = Geometry<Order>::ORDER;
+    static constexpr int SIZE_1 = Geometry<Order>::SIZE_1;
+    static constexpr int SIZE_2 = Geometry<Order>::SIZE_2;
+    static constexpr int MASK_FULL = Geometry<Order>::MASK_FULL;
+    static constexpr int UNITS = Geometry<Order>::UNITS;
+
+    DlxSolver() {
+        reseed(random_seed(), 0);
+    }
+
+    void reseed(std::uint64_t seed, std::uint64_t stream) override {
+        seed_rng(m_rng, seed, stream);
+        m_generator.reseed(seed, stream);
+    }
+
+    void set_stats(SearchStats* stats) override {
+        m_stats = stats;
+        m_generator.set_stats(stats);
+    }
+
+    bool begin(const StateView& initial, bool randomize) override {
+        end();
 
-    if (state.size() == SIZE_2) {
-        groups.resize(SIZE_2 * 3, -1);
+        if (initial.size() != SIZE_2) {
+            return false;
+        }
 
-        // Iterate over filled cells
+        PhaseTimer timer((m_stats != nullptr) ? &m_stats->seconds[PHASE_SETUP] : nullptr);
+        m_initial.resize(SIZE_2);
         for (int index = 0; index < SIZE_2; ++index) {
-            int mask = state[index];
-            if (bit_count(mask) != 1) {
-                continue;
+            m_initial[index] = initial[index];
+        }
+
+        // Header nodes are ROOT followed by one per column, linked into a circular list
+        for (int column = 0; column <= COLUMNS; ++column) {
+            m_left[column] = (column == 0) ? COLUMNS : column - 1;
+            m_right[column] = (column == COLUMNS) ? 0 : column + 1;
+            m_up[column] = column;
+            m_down[column] = column;
+            m_column[column] = column;
+            m_sizes[column] = 0;
+        }
+
+        int node = COLUMNS + 1;
+
+        for (int index = 0; index < SIZE_2; ++index) {
+            int mask = initial[index] & MASK_FULL;
+            for (int value = 0; value < SIZE_1; ++value) {
+                if ((mask & mask_encode(value)) == 0) {
+                    continue;
+                }
+
+                // Append the row's nodes to the bottom of their columns and link them into a circular list
+                int first = node;
+                m_rows[(first - COLUMNS - 1) / 4] = index * SIZE_1 + value;
+
+                for (int i = 0; i < 4; ++i, ++node) {
+                    int column = 1 + ((i == 0) ? index : SIZE_2 + TABLES<Order>.cell_units[index][i - 1] * SIZE_1 + value);
+
+                    m_column[node] = column;
+                    m_down[node] = column;
+                    m_up[node] = m_up[column];
+                    m_down[m_up[column]] = node;
+                    m_up[column] = node;
+                    ++m_sizes[column];
+
+                    m_left[node] = (i == 0) ? node + 3 : node - 1;
+                    m_right[node] = (i == 3) ? first : node + 1;
+                }
+            }
+        }
+
+        m_randomize = randomize;
+        m_descend = true;
+        m_active = true;
+        return true;
+    }
+
+    // Same traversal as Solver::next(), with covered columns in place of grid updates
+    bool next() override {
+        if (!m_active) {
+            return false;
+        }
+
+        PhaseTimer timer((m_stats != nullptr) ? &m_stats->seconds[PHASE_SEARCH] : nullptr);
+
+        while (true) {
+            if (m_descend) {
+                m_descend = false;
+
+                if (m_right[ROOT] == ROOT) {
+                    // All columns are covered, a solution has been found (the rows stay selected until next())
+                    if (m_stats != nullptr) [[unlikely]] {
+                        record_solution();
+                    }
+
+                    return true;
+                }
+
+                // Choose the column with the fewest rows, backtrack if it has none
+                int best_column = m_right[ROOT];
+                for (int column = m_right[best_column]; column != ROOT; column = m_right[column]) {
+                    if (m_sizes[column] < m_sizes[best_column]) {
+                        best_column = column;
+                    }
+                }
+
+                if (m_sizes[best_column] > 0) {
+                    Frame& frame = m_frames[m_depth++];
+                    frame.column = best_column;
+                    frame.count = 0;
+                    frame.next = 0;
+
+                    for (int node = m_down[best_column]; node != best_column; node = m_down[node]) {
+                        frame.nodes[frame.count++] = node;
+                    }
+
+                    if (m_randomize) {
+                        std::shuffle(frame.nodes, frame.nodes + frame.count, m_rng);
+                    }
+
+                    cover(best_column);
+
+                    if (m_stats != nullptr) [[unlikely]] {
+                        m_stats->nodes += 1;
+                        m_stats->propagations += 1;
+                        m_stats->max_depth = std::max(m_stats->max_depth, m_depth);
+                    }
+                }
+                else if (m_stats != nullptr) [[unlikely]] {
+                    m_stats->contradictions += 1;
+                }
             }
 
-            int value = mask_decode(mask);
-            int row = index / SIZE_1;
-            int col = index % SIZE_1;
-            int blk = (row / ORDER) * ORDER + (col / ORDER) % ORDER;
-            int group_indexes[] = {row, col, blk};
+            if (m_depth == 0) {
+                // The whole tree has been searched
+                end();
+                return false;
+            }
 
-            // Store the index of this value in each of this cell's groups
-            // If one of these indexes is already set - there is a conflict
-            for (int group = 0; group < 3; ++group) {
-                int offset = group * SIZE_2 + group_indexes[group] * SIZE_1 + value;
-                if (groups[offset] < 0) {
-                    groups[offset] = index;
+            // Try to select the next row of the innermost frame's column
+            Frame& frame = m_frames[m_depth - 1];
+
+            if (frame.next > 0) {
+                int node = frame.nodes[frame.next - 1];
+                for (int other = m_left[node]; other != node; other = m_left[other]) {
+                    uncover(m_column[other]);
                 }
-                else {
-                    result.insert(groups[offset]);
-                    result.insert(index);
+            }
+
+            if (frame.next == frame.count) {
+                if (m_stats != nullptr) [[unlikely]] {
+                    m_stats->backtracks += 1;
                 }
+
+                uncover(frame.column);
+                --m_depth;
+                continue;
             }
+
+            int node = frame.nodes[frame.next++];
+            for (int other = m_right[node]; other != node; other = m_right[other]) {
+                cover(m_column[other]);
+            }
+
+            if (m_stats != nullptr) [[unlikely]] {
+                m_stats->guesses += (frame.count > 1) ? 1 : 0;
+                m_stats->propagations += 3; // the row's other columns
+            }
+
+            m_descend = true;
         }
     }
 
-    return result;
-}
+    // The links are rebuilt by begin(), so there is nothing to restore
+    void end() override {
+        m_depth = 0;
+        m_active = false;
+    }
 
-// Returns a mask of possible values for the given cell index
-int list_candidates(const std::vector<int>& state, int index) {
-    int mask = MASK_FULL;
-    int row = index / SIZE_1;
-    int col = index % SIZE_1;
-    int blk = (row / ORDER) * ORDER + (col / ORDER) % ORDER;
-    int group_indexes[] = {row, col, blk};
+    // Scoring is not a part of the search, so it is left out of the stats
+    result_t solution() const override {
+        std::vector<int> cells(SIZE_2, MASK_FULL);
+        for (int depth = 0; depth < m_depth; ++depth) {
+            const Frame& frame = m_frames[depth];
+            int row = m_rows[(frame.nodes[frame.next - 1] - COLUMNS - 1) / 4];
+            cells[row / SIZE_1] = mask_encode(row % SIZE_1);
+        }
 
-    for (int group = 0; group < 3; ++group) {
-        for (int offset = 0; offset < SIZE_1; ++offset) {
-            int other_index = group_combine(group, group_indexes[group], offset);
-            int other_mask = state[other_index];
-            if ((other_index != index) && (bit_count(other_mask) == 1)) {
-                mask &= ~other_mask;
+        m_generator.set_stats(nullptr);
+        int score = m_generator.score_path(m_initial, cells);
+        m_generator.set_stats(m_stats);
+
+        return {cells, score};
+    }
+
+    std::vector<result_t> solve(const StateView& initial, bool randomize, int limit) override {
+        std::vector<result_t> results;
+
+        if ((limit > 0) && begin(initial, randomize)) {
+            while (next()) {
+                results.push_back(solution());
+                if (results.size() >= (size_t)limit) {
+                    break;
+                }
             }
         }
+
+        end();
+        return results;
     }
 
-    return mask;
-}
+    int count_solutions(const StateView& initial, int cap) override {
+        int count = 0;
+
+        if ((cap > 0) && begin(initial, false)) {
+            while (next()) {
+                if (++count >= cap) {
+                    break;
+                }
+            }
+        }
+
+        end();
+        return count;
+    }
+
+    result_t generate_once() override {
+        return m_generator.generate_once();
+    }
+
+    result_t generate(int score_min, int score_max, int limit) override {
+        return m_generator.generate(score_min, score_max, limit);
+    }
 
+    result_t generate_targeted(int score_min, int score_max, int limit) override {
+        return m_generator.generate_targeted(score_min, score_max, limit);
+    }
+
+private:
+    static constexpr int ROOT = 0;
+    static constexpr int COLUMNS = SIZE_2 + UNITS * SIZE_1; // cells, values in units
+    static constexpr int NODES = 1 + COLUMNS + SIZE_2 * SIZE_1 * 4; // root, column headers, rows
+
+    struct Frame {
+        int column; // column whose rows are tried
+        int nodes[SIZE_1]; // nodes of the rows to be tried (in the column)
+        int count; // number of rows
+        int next; // index of the next row to try
+    };
+
+    // Removes a column from the header list and its rows from all other columns
+    void cover(int column) {
+        m_right[m_left[column]] = m_right[column];
+        m_left[m_right[column]] = m_left[column];
+
+        for (int row = m_down[column]; row != column; row = m_down[row]) {
+            for (int node = m_right[row]; node != row; node = m_right[node]) {
+                m_down[m_up[node]] = m_down[node];
+                m_up[m_down[node]] = m_up[node];
+                --m_sizes[m_column[node]];
+            }
+        }
+    }
+
+    // Counts a solution, with the cells of the rows chosen among several as its path
+    void record_solution() {
+        m_stats->solutions += 1;
+        m_stats->path.clear();
+
+        for (int depth = 0; depth < m_depth; ++depth) {
+            const Frame& frame = m_frames[depth];
+            if (frame.count > 1) {
+                m_stats->path.push_back(m_rows[(frame.nodes[frame.next - 1] - COLUMNS - 1) / 4] / SIZE_1);
+            }
+        }
+    }
+
+    // Undoes cover(), in reverse order
+    void uncover(int column) {
+        for (int row = m_up[column]; row != column; row = m_up[row]) {
+            for (int node = m_left[row]; node != row; node = m_left[node]) {
+                ++m_sizes[m_column[node]];
+                m_down[m_up[node]] = node;
+                m_up[m_down[node]] = node;
+            }
+        }
+
+        m_right[m_left[column]] = column;
+        m_left[m_right[column]] = column;
+    }
+
+    std::array<int, NODES> m_left;
+    std::array<int, NODES> m_right;
+    std::array<int, NODES> m_up;
+    std::array<int, NODES> m_down;
+    std::array<int, NODES> m_column;
+    std::array<int, COLUMNS + 1> m_sizes;
+    std::array<int, SIZE_2 * SIZE_1> m_rows; // (cell index * SIZE_1 + value) of every row, in order of linking
+    std::array<Frame, SIZE_2> m_frames;
+    int m_depth = 0;
+    bool m_randomize = false;
+    bool m_descend = false;
+    bool m_active = false;
+    SearchStats* m_stats = nullptr;
+    std::mt19937 m_rng;
+    std::vector<int> m_initial; // state given to begin(), for scoring
+    mutable Solver<BitboardGrid<Order>> m_generator; // also scores solutions, see solution()
+};
+
+// Creates a solver for grids of the given order using the engine with the given name
+std::unique_ptr<SolverBase> make_solver(const std::string& engine, int order) {
+    return with_order(order, [&](auto order_constant) -> std::unique_ptr<SolverBase> {
+        constexpr int Order = decltype(order_constant)::value;
+
+        if (engine == "groups") {
+            return std::make_unique<Solver<GroupGrid<Order>>>();
+        }
+        else if (engine == "bitboard") {
+            return std::make_unique<Solver<BitboardGrid<Order>>>();
+        }
+        else if (engine == "dlx") {
+            return std::make_unique<DlxSolver<Order>>();
+        }
+
+        throw std::invalid_argument("Unknown solver engine: " + engine);
+    });
+}
+
+// Solves every board on a pool of `workers` threads (one per hardware thread if not positive), each with its own Solver.
+// Results are stored in the same order as the boards
+std::vector<std::vector<result_t>> solve_many(
+    const std::vector<std::vector<int>>& boards, int limit, int workers, const std::string& engine, int order
+) {
+    std::vector<std::vector<result_t>> results(boards.size());
+    std::atomic<size_t> next = 0;
+    std::exception_ptr error;
+    std::atomic_flag error_flag;
+
+    auto worker = [&]() {
+        try {
+            auto solver = make_solver(engine, order);
+            for (size_t i = next++; i < boards.size(); i = next++) {
+                results[i] = solver->solve(boards[i], false, limit);
+            }
+        }
+        catch (...) {
+            // Keep the first exception and make the other workers run out of boards
+            if (!error_flag.test_and_set()) {
+                error = std::current_exception();
+            }
+            next = boards.size();
+        }
+    };
+
+    if (workers <= 0) {
+        workers = std::max((int)std::thread::hardware_concurrency(), 1);
+    }
+
+    workers = std::min(workers, (int)boards.size());
+
+    // The calling thread acts as one of the workers
+    std::vector<std::thread> threads;
+    for (int i = 1; i < workers; ++i) {
+        threads.emplace_back(worker);
+    }
+
+    worker();
+
+    for (auto& thread : threads) {
+        thread.join();
+    }
+
+    if (error) {
+        std::rethrow_exception(error);
+    }
+
+    return results;
+}
+
+// Sets out[index] to 1 for every cell which is in conflict with any other cell, and to 0 for every other cell.
+// `state` is anything indexable by cell (a pointer to the masks or a StateView)
+template <int Order, typename S>
+void mark_conflicts(const S& state, std::uint8_t* out) {
+    using G = Geometry<Order>;
+
+    std::array<int, G::UNITS * G::SIZE_1> groups; // stores the index of each value in every group (or -1 by default)
+    groups.fill(-1);
+    std::fill(out, out + G::SIZE_2, 0);
+
+    // Iterate over filled cells
+    for (int index = 0; index < G::SIZE_2; ++index) {
+        int mask = state[index];
+        if ((bit_count(mask) != 1) || ((mask & ~G::MASK_FULL) != 0)) {
+            continue;
+        }
+
+        int value = mask_decode(mask);
+
+        // Store the index of this value in each of this cell's groups
+        // If one of these indexes is already set - there is a conflict
+        for (int unit : TABLES<Order>.cell_units[index]) {
+            int offset = unit * G::SIZE_1 + value;
+            if (groups[offset] < 0) {
+                groups[offset] = index;
+            }
+            else {
+                out[groups[offset]] = 1;
+                out[index] = 1;
+            }
+        }
+    }
+}
+
+// Returns the indexes of all cells which are in conflict with any other cell (the order is given by the state's size)
+std::unordered_set<int> list_conflicts(const StateView& state) {
+    std::unordered_set<int> result;
+    int order = order_of(state.size());
+
+    if (order != 0) {
+        with_order(order, [&](auto order_constant) {
+            constexpr int Order = decltype(order_constant)::value;
+
+            std::array<std::uint8_t, Geometry<Order>::SIZE_2> conflicts;
+            mark_conflicts<Order>(state, conflicts.data());
+
+            for (int index = 0; index < Geometry<Order>::SIZE_2; ++index) {
+                if (conflicts[index] != 0) {
+                    result.insert(index);
+                }
+            }
+        });
+    }
+
+    return result;
+}
+
+// Calls `function` like with_order(), for orders whose masks fit in 16 bits (as used by batched functions)
+template <typename F>
+decltype(auto) with_order_16(int order, F&& function) {
+    if (order > 4) {
+        throw std::invalid_argument("Order " + std::to_string(order) + " does not fit in 16-bit masks");
+    }
+
+    return with_order(order, function);
+}
+
+// Batched version of mark_conflicts() for `count` consecutive states
+void mark_conflicts_many(const std::uint16_t* states, size_t count, std::uint8_t* out, int order) {
+    with_order_16(order, [&](auto order_constant) {
+        constexpr int Order = decltype(order_constant)::value;
+        constexpr int SIZE_2 = Geometry<Order>::SIZE_2;
+
+        for (size_t i = 0; i < count; ++i) {
+            mark_conflicts<Order>(states + i * SIZE_2, out + i * SIZE_2);
+        }
+    });
+}
+
+// Decodes states stored one per line in the format of vsext.encode_state() ('.' or '0' for unfilled cells),
+// ignoring empty lines and anything following the first SIZE_2 characters of a line.
+// Writes SIZE_2 masks per state to `out` unless it is null (which allows counting the states first).
+// Returns the number of states, or -(line + 1) if the given (zero-based) line does not start with a valid state
+long decode_states(const char* data, size_t size, std::uint16_t* out, int order) {
+    return with_order_16(order, [&](auto order_constant) -> long {
+        using G = Geometry<decltype(order_constant)::value>;
+
+        long count = 0;
+        long line = 0;
+        size_t begin = 0;
+
+        while (begin < size) {
+            size_t end = begin;
+            while ((end < size) && (data[end] != '\n')) {
+                ++end;
+            }
+
+            size_t length = end - begin;
+            if ((length > 0) && (data[end - 1] == '\r')) {
+                --length;
+            }
+
+            if (length > 0) {
+                if (length < G::SIZE_2) {
+                    return -(line + 1);
+                }
+
+                for (int index = 0; index < G::SIZE_2; ++index) {
+                    int value = value_decode(data[begin + index]);
+                    if ((value < -1) || (value >= G::SIZE_1)) {
+                        return -(line + 1);
+                    }
+
+                    if (out != nullptr) {
+                        out[count * G::SIZE_2 + index] = (value < 0) ? G::MASK_FULL : mask_encode(value);
+                    }
+                }
+
+                ++count;
+            }
+
+            begin = end + 1;
+            ++line;
+        }
+
+        return count;
+    });
+}
+
+// Encodes `count` consecutive states into lines of SIZE_2 characters followed by a newline (see decode_states()).
+// Returns `false` if some mask is out of range
+bool encode_states(const std::uint16_t* states, size_t count, char* out, int order) {
+    return with_order_16(order, [&](auto order_constant) {
+        using G = Geometry<decltype(order_constant)::value>;
+
+        for (size_t i = 0; i < count; ++i) {
+            for (int index = 0; index < G::SIZE_2; ++index) {
+                int mask = states[i * G::SIZE_2 + index];
+                if (mask > G::MASK_FULL) {
+                    return false;
+                }
+
+                *(out++) = (bit_count(mask) == 1) ? VALUE_CHARS[mask_decode(mask)] : '.';
+            }
+
+            *(out++) = '\n';
+        }
+
+        return true;
+    });
+}
+
+// Returns a mask of possible values for the given cell index (the order is given by the state's size)
+int list_candidates(const StateView& state, int index) {
+    int order = order_of(state.size());
+    if ((order == 0) || (index < 0) || (index >= (int)state.size())) {
+        return 0;
+    }
+
+    return with_order(order, [&](auto order_constant) {
+        constexpr int Order = decltype(order_constant)::value;
+        int mask = Geometry<Order>::MASK_FULL;
+
+        for (int peer : TABLES<Order>.cell_peers[index]) {
+            int peer_mask = state[peer];
+            if (bit_count(peer_mask) == 1) {
+                mask &= ~peer_mask;
+            }
+        }
+
+        return mask;
+    });
+}
+
+// Returns the masks of possible values of all cells, as list_candidates() does for one (the order is given by
+// the state's size). Peers are accounted for by unit, so this costs about as much as a few list_candidates() calls
+std::vector<int> list_all_candidates(const StateView& state) {
+    int order = order_of(state.size());
+    if (order == 0) {
+        return {};
+    }
+
+    return with_order(order, [&](auto order_constant) {
+        constexpr int Order = decltype(order_constant)::value;
+        using G = Geometry<Order>;
+
+        std::array<int, G::UNITS * G::SIZE_1> counts{}; // number of cells holding each value in every unit
+        std::array<int, G::UNITS> used{}; // mask of the values held in every unit
+
+        for (int index = 0; index < G::SIZE_2; ++index) {
+            int mask = state[index];
+            if ((bit_count(mask) == 1) && (mask <= G::MASK_FULL)) {
+                for (int unit : TABLES<Order>.cell_units[index]) {
+                    used[unit] |= mask;
+                    ++counts[unit * G::SIZE_1 + mask_decode(mask)];
+                }
+            }
+        }
+
+        std::vector<int> result(G::SIZE_2);
+        for (int index = 0; index < G::SIZE_2; ++index) {
+            int mask = state[index];
+            int unavailable = 0;
+            bool shared = false; // whether a peer holds the cell's own value
+
+            for (int unit : TABLES<Order>.cell_units[index]) {
+                unavailable |= used[unit];
+            }
+
+            if ((bit_count(mask) == 1) && (mask <= G::MASK_FULL)) {
+                for (int unit : TABLES<Order>.cell_units[index]) {
+                    shared = shared || (counts[unit * G::SIZE_1 + mask_decode(mask)] > 1);
+                }
+
+                if (!shared) {
+                    unavailable &= ~mask;
+                }
+            }
+
+            result[index] = G::MASK_FULL & ~unavailable;
+        }
+
+        return result;
+    });
+}
+
+// Board state of a game with runtime order, see Board
+class BoardBase {
+public:
+    virtual ~BoardBase() = default;
+
+    virtual int size() const = 0;
+    virtual const std::uint16_t* data() const = 0;
+    virtual std::vector<int> state() const = 0;
+    virtual void load(const StateView& state) = 0;
+    virtual bool set(int index, int mask, std::vector<int>& changed) = 0;
+    virtual int candidates(int index) const = 0;
+    virtual const std::uint16_t* candidate_data() const = 0;
+    virtual bool conflicted(int index) const = 0;
+    virtual int conflict_count() const = 0;
+};
+
+// Cell masks of a game (in 16 bits, so up to order 4) with every unit's count of cells holding each value.
+// The counts are updated on every change of a cell, which keeps the conflicts and candidates of all cells
+// up to date at the cost of looking only at the cell's own units and peers
+template <int Order>
+class Board : public BoardBase {
+public:
+    using G = Geometry<Order>;
+
+    Board() {
+        m_cells.fill(G::MASK_FULL);
+        m_counts.fill(0);
+        m_used.fill(0);
+        m_conflicts.fill(0);
+        m_candidates.fill(G::MASK_FULL);
+    }
+
+    int size() const override {
+        return G::SIZE_2;
+    }
+
+    const std::uint16_t* data() const override {
+        return m_cells.data();
+    }
+
+    std::vector<int> state() const override {
+        return std::vector<int>(m_cells.begin(), m_cells.end());
+    }
+
+    void load(const StateView& state) override {
+        if (state.size() != G::SIZE_2) {
+            throw std::invalid_argument("Expected " + std::to_string(G::SIZE_2) + " cells");
+        }
+
+        for (int index = 0; index < G::SIZE_2; ++index) {
+            int mask = state[index];
+            if ((mask < 0) || (mask > std::numeric_limits<std::uint16_t>::max())) {
+                throw std::invalid_argument("Invalid cell mask: " + std::to_string(mask));
+            }
+        }
+
+        for (int index = 0; index < G::SIZE_2; ++index) {
+            m_cells[index] = state[index];
+        }
+        m_counts.fill(0);
+        m_used.fill(0);
+
+        for (int index = 0; index < G::SIZE_2; ++index) {
+            add(index, value(index), 1);
+        }
+
+        m_conflict_count = 0;
+        for (int index = 0; index < G::SIZE_2; ++index) {
+            m_conflicts[index] = has_conflict(index);
+            m_conflict_count += m_conflicts[index];
+            m_candidates[index] = find_candidates(index);
+        }
+    }
+
+    // Replaces the mask of a cell and stores the indexes of the cells whose conflict state changed in `changed`.
+    // Returns whether the value of the cell changed (otherwise neither conflicts nor candidates did)
+    bool set(int index, int mask, std::vector<int>& changed) override {
+        changed.clear();
+
+        int value_old = value(index);
+        m_cells[index] = mask;
+        int value_new = value(index);
+
+        if (value_old == value_new) {
+            return false;
+        }
+
+        add(index, value_old, -1);
+        add(index, value_new, 1);
+
+        // Candidates only depend on the cell's units, which only peers share
+        m_candidates[index] = find_candidates(index);
+        for (int peer : TABLES<Order>.cell_peers[index]) {
+            m_candidates[peer] = find_candidates(peer);
+        }
+
+        // Only cells holding one of the two values in this cell's units can have their conflict state changed
+        for (int unit : TABLES<Order>.cell_units[index]) {
+            for (int other : TABLES<Order>.unit_cells[unit]) {
+                int value_other = value(other);
+                if ((value_other >= 0) && ((value_other == value_old) || (value_other == value_new))) {
+                    update_conflict(other, changed);
+                }
+            }
+        }
+
+        // The cell itself was left out above if it became unfilled
+        update_conflict(index, changed);
+        return true;
+    }
+
+    int candidates(int index) const override {
+        return m_candidates[index];
+    }
+
+    const std::uint16_t* candidate_data() const override {
+        return m_candidates.data();
+    }
+
+    bool conflicted(int index) const override {
+        return m_conflicts[index] != 0;
+    }
+
+    int conflict_count() const override {
+        return m_conflict_count;
+    }
+
+private:
+    // Same as list_candidates(): values not held by any of the cell's peers
+    int find_candidates(int index) const {
+        int used = 0;
+        for (int unit : TABLES<Order>.cell_units[index]) {
+            used |= m_used[unit];
+        }
+
+        // The cell's own value only counts if a peer holds it too
+        int value_own = value(index);
+        if ((value_own >= 0) && !has_conflict(index)) {
+            used &= ~mask_encode(value_own);
+        }
+
+        return G::MASK_FULL & ~used;
+    }
+
+    // Value of a filled cell, -1 for cells with several (or invalid) values
+    int value(int index) const {
+        int mask = m_cells[index];
+        return ((bit_count(mask) == 1) && (mask <= G::MASK_FULL)) ? mask_decode(mask) : -1;
+    }
+
+    void add(int index, int value, int delta) {
+        if (value < 0) {
+            return;
+        }
+
+        for (int unit : TABLES<Order>.cell_units[index]) {
+            int count = (m_counts[unit * G::SIZE_1 + value] += delta);
+            if (count > 0) {
+                m_used[unit] |= mask_encode(value);
+            }
+            else {
+                m_used[unit] &= ~mask_encode(value);
+            }
+        }
+    }
+
+    bool has_conflict(int index) const {
+        int value_own = value(index);
+        if (value_own < 0) {
+            return false;
+        }
+
+        for (int unit : TABLES<Order>.cell_units[index]) {
+            if (m_counts[unit * G::SIZE_1 + value_own] > 1) {
+                return true;
+            }
+        }
+
+        return false;
+    }
+
+    void update_conflict(int index, std::vector<int>& changed) {
+        std::uint8_t conflict = has_conflict(index);
+        if (conflict != m_conflicts[index]) {
+            m_conflicts[index] = conflict;
+            m_conflict_count += conflict ? 1 : -1;
+            changed.push_back(index);
+        }
+    }
+
+    std::array<std::uint16_t, G::SIZE_2> m_cells;
+    std::array<std::uint8_t, G::UNITS * G::SIZE_1> m_counts; // number of cells holding each value in every unit
+    std::array<int, G::UNITS> m_used; // mask of the values held by any cell of every unit
+    std::array<std::uint8_t, G::SIZE_2> m_conflicts; // whether every cell is in conflict with another one
+    std::array<std::uint16_t, G::SIZE_2> m_candidates; // mask of the candidates of every cell
+    int m_conflict_count = 0;
+};
+
+// Creates an empty board of the given order
+std::unique_ptr<BoardBase> make_board(int order) {
+    return with_order_16(order, [](auto order_constant) -> std::unique_ptr<BoardBase> {
+        constexpr int Order = decltype(order_constant)::value;
+
+        // Larger orders are rejected by with_order_16(), but still instantiated
+        if constexpr (Order <= 4) {
+            return std::make_unique<Board<Order>>();
+        }
+        else {
+            return nullptr;
+        }
+    });
+}
+
+// Solving techniques known to the grader, from the easiest to the hardest
+enum Technique {
+    HIDDEN_SINGLE,
+    NAKED_SINGLE,
+    POINTING,
+    CLAIMING,
+    NAKED_PAIR,
+    HIDDEN_PAIR,
+    NAKED_TRIPLE,
+    HIDDEN_TRIPLE,
+    X_WING,
+    SWORDFISH,
+    TECHNIQUES
+};
+
+constexpr std::array<const char*, TECHNIQUES> TECHNIQUE_NAMES = {
+    "hidden_single", "naked_single", "pointing", "claiming", "naked_pair",
+    "hidden_pair", "naked_triple", "hidden_triple", "x_wing", "swordfish",
+};
+
+// Contribution of a single application of every technique to the rating
+constexpr std::array<int, TECHNIQUES> TECHNIQUE_WEIGHTS = {1, 2, 4, 5, 10, 12, 16, 20, 25, 35};
+
+// Contribution of every cell left unfilled when none of the techniques make progress
+constexpr int STUCK_WEIGHT = 50;
+
+struct Grade {
+    std::vector<int> histogram; // number of applications of every technique
+    int rating = 0; // weighted sum of the histogram (see TECHNIQUE_WEIGHTS, STUCK_WEIGHT)
+    bool solved = false; // whether the techniques were enough to solve the puzzle
+};
+
+// Solves a puzzle the way a person would, without guessing. Every step applies the easiest technique that makes
+// progress, so the histogram of applied techniques (and the rating derived from it) does not depend on search order
+template <int Order>
+class Grader {
+public:
+    static constexpr int SIZE_1 = Geometry<Order>::SIZE_1;
+    static constexpr int SIZE_2 = Geometry<Order>::SIZE_2;
+    static constexpr int MASK_FULL = Geometry<Order>::MASK_FULL;
+    static constexpr int UNITS = Geometry<Order>::UNITS;
+
+    Grade grade(const StateView& state) {
+        Grade result;
+        result.histogram.assign(TECHNIQUES, 0);
+
+        m_unfilled = SIZE_2;
+        m_broken = false;
+        m_filled.fill(false);
+
+        for (int index = 0; (index < SIZE_2) && !m_broken; ++index) {
+            m_cells[index] = state[index] & MASK_FULL;
+            m_broken = (m_cells[index] == 0);
+        }
+
+        for (int index = 0; (index < SIZE_2) && !m_broken; ++index) {
+            if (bit_count(state[index]) == 1) {
+                place(index);
+            }
+        }
+
+        while ((m_unfilled > 0) && !m_broken) {
+            int technique = step();
+            if (technique < 0) {
+                break;
+            }
+
+            ++result.histogram[technique];
+            result.rating += TECHNIQUE_WEIGHTS[technique];
+        }
+
+        result.solved = (m_unfilled == 0) && !m_broken;
+        if (!result.solved) {
+            result.rating += STUCK_WEIGHT * m_unfilled;
+        }
+
+        return result;
+    }
+
+private:
+    // Applies the easiest technique that makes progress and returns it, or -1 if none does
+    int step() {
+        if (hidden_single()) {
+            return HIDDEN_SINGLE;
+        }
+
+        if (naked_single()) {
+            return NAKED_SINGLE;
+        }
+
+        if (locked_candidates(BLK)) {
+            return POINTING;
+        }
+
+        if (locked_candidates(ROW) || locked_candidates(COL)) {
+            return CLAIMING;
+        }
+
+        if (naked_subset(2)) {
+            return NAKED_PAIR;
+        }
+
+        if (hidden_subset(2)) {
+            return HIDDEN_PAIR;
+        }
+
+        if (naked_subset(3)) {
+            return NAKED_TRIPLE;
+        }
+
+        if (hidden_subset(3)) {
+            return HIDDEN_TRIPLE;
+        }
+
+        if (fish(2)) {
+            return X_WING;
+        }
+
+        if (fish(3)) {
+            return SWORDFISH;
+        }
+
+        return -1;
+    }
+
+    // Fills a cell with its only candidate and removes it from the peers
+    void place(int index) {
+        int mask = m_cells[index];
+        m_filled[index] = true;
+        --m_unfilled;
+
+        for (int peer : TABLES<Order>.cell_peers[index]) {
+            if (m_filled[peer]) {
+                m_broken = m_broken || (m_cells[peer] == mask);
+            }
+            else {
+                eliminate(peer, mask);
+            }
+        }
+    }
+
+    // Removes candidates from an unfilled cell, returns whether any were removed
+    bool eliminate(int index, int mask) {
+        if ((m_filled[index]) || ((m_cells[index] & mask) == 0)) {
+            return false;
+        }
+
+        m_cells[index] &= ~mask;
+        m_broken = m_broken || (m_cells[index] == 0);
+        return true;
+    }
+
+    // Mask of the offsets of the unfilled cells of a unit which have the given candidate
+    int positions(int unit, int mask) const {
+        int result = 0;
+        for (int offset = 0; offset < SIZE_1; ++offset) {
+            int index = TABLES<Order>.unit_cells[unit][offset];
+            if (!m_filled[index] && ((m_cells[index] & mask) != 0)) {
+                result |= 1 << offset;
+            }
+        }
+
+        return result;
+    }
+
+    // Mask of the values already placed in a unit
+    int placed(int unit) const {
+        int result = 0;
+        for (int index : TABLES<Order>.unit_cells[unit]) {
+            if (m_filled[index]) {
+                result |= m_cells[index];
+            }
+        }
+
+        return result;
+    }
+
+    bool hidden_single() {
+        for (int unit = 0; unit < UNITS; ++unit) {
+            int missing = MASK_FULL & ~placed(unit);
+            for (int mask = 1; mask <= MASK_FULL; mask <<= 1) {
+                if ((missing & mask) == 0) {
+                    continue;
+                }
+
+                int found = positions(unit, mask);
+                if (found == 0) {
+                    m_broken = true;
+                    return false;
+                }
+
+                if (bit_count(found) == 1) {
+                    int index = TABLES<Order>.unit_cells[unit][mask_decode(found)];
+                    m_cells[index] = mask;
+                    place(index);
+                    return true;
+                }
+            }
+        }
+
+        return false;
+    }
+
+    bool naked_single() {
+        for (int index = 0; index < SIZE_2; ++index) {
+            if (!m_filled[index] && (bit_count(m_cells[index]) == 1)) {
+                place(index);
+                return true;
+            }
+        }
+
+        return false;
+    }
+
+    // Pointing (BLK): a candidate confined to one row or column inside a block is removed from the rest of that line.
+    // Claiming (ROW, COL): a candidate confined to one block inside a line is removed from the rest of that block
+    bool locked_candidates(int group) {
+        for (int unit = group * SIZE_1; unit < (group + 1) * SIZE_1; ++unit) {
+            for (int mask = 1; mask <= MASK_FULL; mask <<= 1) {
+                int found = positions(unit, mask);
+                if (bit_count(found) < 2) {
+                    continue;
+                }
+
+                for (int other = 0; other < 3; ++other) {
+                    if (other == group) {
+                        continue;
+                    }
+
+                    // Check whether all positions share the same unit of the other group
+                    int target = -1;
+                    for (int offset = 0; offset < SIZE_1; ++offset) {
+                        if ((found & (1 << offset)) == 0) {
+                            continue;
+                        }
+
+                        int other_unit = TABLES<Order>.cell_units[TABLES<Order>.unit_cells[unit][offset]][other];
+                        target = ((target < 0) || (target == other_unit)) ? other_unit : UNITS;
+                    }
+
+                    if (target == UNITS) {
+                        continue;
+                    }
+
+                    bool changed = false;
+                    for (int index : TABLES<Order>.unit_cells[target]) {
+                        if (TABLES<Order>.cell_units[index][group] != unit) {
+                            changed = eliminate(index, mask) || changed;
+                        }
+                    }
+
+                    if (changed) {
+                        return true;
+                    }
+                }
+            }
+        }
+
+        return false;
+    }
+
+    // Calls apply(selected, combined) for every `size` of the nonzero `masks` (ignoring those with more than `size`
+    // bits) whose union has exactly `size` bits, where `selected` has a bit set for each chosen mask.
+    // Stops as soon as apply() returns true
+    template <typename F>
+    static bool find_subsets(const std::array<int, SIZE_1>& masks, int size, F apply,
+                             int start = 0, int selected = 0, int combined = 0) {
+        if (bit_count(selected) == size) {
+            return (bit_count(combined) == size) && apply(selected, combined);
+        }
+
+        for (int i = start; i < SIZE_1; ++i) {
+            int mask = masks[i];
+            if ((mask == 0) || (bit_count(mask) > size) || (bit_count(combined | mask) > size)) {
+                continue;
+            }
+
+            if (find_subsets(masks, size, apply, i + 1, selected | (1 << i), combined | mask)) {
+                return true;
+            }
+        }
+
+        return false;
+    }
+
+    // `size` cells of a unit with only `size` candidates between them: these are removed from the other cells
+    bool naked_subset(int size) {
+        for (int unit = 0; unit < UNITS; ++unit) {
+            std::array<int, SIZE_1> masks;
+            for (int offset = 0; offset < SIZE_1; ++offset) {
+                int index = TABLES<Order>.unit_cells[unit][offset];
+                masks[offset] = m_filled[index] ? 0 : m_cells[index];
+            }
+
+            auto apply = [&](int selected, int combined) {
+                bool changed = false;
+                for (int offset = 0; offset < SIZE_1; ++offset) {
+                    if ((selected & (1 << offset)) == 0) {
+                        changed = eliminate(TABLES<Order>.unit_cells[unit][offset], combined) || changed;
+                    }
+                }
+
+                return changed;
+            };
+
+            if (find_subsets(masks, size, apply)) {
+                return true;
+            }
+        }
+
+        return false;
+    }
+
+    // `size` candidates of a unit confined to `size` cells: the other candidates are removed from those cells
+    bool hidden_subset(int size) {
+        for (int unit = 0; unit < UNITS; ++unit) {
+            std::array<int, SIZE_1> masks;
+            for (int value = 0; value < SIZE_1; ++value) {
+                masks[value] = positions(unit, mask_encode(value));
+            }
+
+            auto apply = [&](int selected, int combined) {
+                bool changed = false;
+                for (int offset = 0; offset < SIZE_1; ++offset) {
+                    if ((combined & (1 << offset)) != 0) {
+                        changed = eliminate(TABLES<Order>.unit_cells[unit][offset], MASK_FULL & ~selected) || changed;
+                    }
+                }
+
+                return changed;
+            };
+
+            if (find_subsets(masks, size, apply)) {
+                return true;
+            }
+        }
+
+        return false;
+    }
+
+    // X-wing (size 2), swordfish (size 3): a candidate confined to `size` columns within `size` rows
+    // is removed from the rest of those columns (and the same with rows and columns swapped)
+    bool fish(int size) {
+        for (int mask = 1; mask <= MASK_FULL; mask <<= 1) {
+            for (int group : {ROW, COL}) {
+                int cover_group = (group == ROW) ? COL : ROW;
+
+                std::array<int, SIZE_1> masks;
+                for (int line = 0; line < SIZE_1; ++line) {
+                    masks[line] = positions(group * SIZE_1 + line, mask);
+                }
+
+                auto apply = [&](int selected, int combined) {
+                    bool changed = false;
+                    for (int line = 0; line < SIZE_1; ++line) {
+                        if ((combined & (1 << line)) == 0) {
+                            continue;
+                        }
+
+                        // Offsets within a column are rows and vice versa
+                        for (int offset = 0; offset < SIZE_1; ++offset) {
+                            if ((selected & (1 << offset)) == 0) {
+                                int index = TABLES<Order>.unit_cells[cover_group * SIZE_1 + line][offset];
+                                changed = eliminate(index, mask) || changed;
+                            }
+                        }
+                    }
+
+                    return changed;
+                };
+
+                if (find_subsets(masks, size, apply)) {
+                    return true;
+                }
+            }
+        }
+
+        return false;
+    }
+
+    std::array<int, SIZE_2> m_cells;
+    std::array<bool, SIZE_2> m_filled;
+    int m_unfilled = 0;
+    bool m_broken = false; // whether a contradiction was found
+};
+
+// Grades a puzzle by the techniques needed to solve it (see Grader), the order is given by the state's size
+Grade grade(const StateView& state) {
+    int order = order_of(state.size());
+    if (order == 0) {
+        return {std::vector<int>(TECHNIQUES, 0), 0, false};
+    }
+
+    return with_order(order, [&](auto order_constant) {
+        return Grader<decltype(order_constant)::value>().grade(state);
+    });
+}